@@ -1,13 +1,16 @@
 import os
 import json
 import time
-import shutil
 import requests
 from tqdm import tqdm
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, unquote
 import undetected_chromedriver as uc
 
+from http_cache import HttpCache, CachingAdapter
+from snapshot_archive import SnapshotArchive
+from media_downloader import download_file, DOWNLOAD_STATS
+
 BASE_URL = "https://www.unblock.coffee"
 YEARLY_URLS = {
     # 2025: "https://www.unblock.coffee/selection/superbowl-commercials-2025/",
@@ -19,49 +22,100 @@ YEARLY_URLS = {
 }
 HEADERS = {"User-Agent": "Mozilla/5.0"}
 
-def fetch_with_selenium(url):
-    print(f"🌐 Opening browser for: {url}")
-    options = uc.ChromeOptions()
-    options.add_argument("--headless")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--window-size=1920,1080")
-    driver = uc.Chrome(options=options)
-    driver.get(url)
-    time.sleep(2)
-
-    for _ in range(5):  # Scroll to load all campaigns
+# Every fetched page is kept in a compressed snapshot archive. REPLAY = True
+# re-parses the archive offline (no browser, no network, no media downloads).
+ARCHIVE = SnapshotArchive()
+REPLAY = False
+
+# Campaign pages are revalidated with conditional GETs on re-runs (304 = served from disk)
+HTTP_CACHE = HttpCache()
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+SESSION.mount("http://", CachingAdapter(cache=HTTP_CACHE))
+SESSION.mount("https://", CachingAdapter(cache=HTTP_CACHE))
+
+SCROLL_PAUSE = 0.75  # seconds to let lazy-loaded cards arrive
+SCROLL_MAX_ROUNDS = 60
+SCROLL_STABLE_ROUNDS = 2  # stop after this many scrolls with no new campaigns
+
+_driver = None
+
+def get_driver():
+    """Start Chrome once and reuse it for every yearly index page."""
+    global _driver
+    if _driver is None:
+        print("🌐 Starting browser")
+        options = uc.ChromeOptions()
+        options.add_argument("--headless")
+        options.add_argument("--disable-gpu")
+        options.add_argument("--window-size=1920,1080")
+        _driver = uc.Chrome(options=options)
+    return _driver
+
+def close_driver():
+    global _driver
+    if _driver is not None:
+        try:
+            _driver.quit()
+        except Exception:
+            pass
+        _driver = None
+
+def count_campaign_links(driver):
+    return driver.execute_script(
+        "return document.querySelectorAll('a[href*=\"/campaign/\"]').length;"
+    )
+
+def scroll_until_stable(driver):
+    """Scroll until the number of /campaign/ anchors stops growing."""
+    last = count_campaign_links(driver)
+    stable = 0
+    for _ in range(SCROLL_MAX_ROUNDS):
         driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(1)
+        time.sleep(SCROLL_PAUSE)
+        current = count_campaign_links(driver)
+        if current > last:
+            last = current
+            stable = 0
+            continue
+        stable += 1
+        if stable >= SCROLL_STABLE_ROUNDS:
+            break
+    return last
 
+def fetch_with_selenium(url):
+    if REPLAY:
+        return ARCHIVE.get(url) or ""
+    print(f"🌐 Opening: {url}")
+    driver = get_driver()
+    driver.get(url)
+    total = scroll_until_stable(driver)
+    print(f"   Loaded {total} campaign anchors")
     html = driver.page_source
-    driver.quit()
+    ARCHIVE.add(url, html, source="unblock.coffee")
     return html
 
 def extract_campaign_links(url):
     html = fetch_with_selenium(url)
     soup = BeautifulSoup(html, "html.parser")
-    links = {
-        a["href"] for a in soup.find_all("a", href=True)
-        if "/campaign/" in a["href"]
-    }
+    links = {a["href"] for a in soup.select('a[href*="/campaign/"]')}
     print(f"✅ Found {len(links)} campaigns")
     return list(links)
 
 def fetch_html(url):
-    r = requests.get(url, headers=HEADERS)
+    if REPLAY:
+        html = ARCHIVE.get(url)
+        if html is None:
+            raise LookupError(f"No snapshot for {url}")
+        return html
+    r = SESSION.get(url, timeout=30)
     r.raise_for_status()
+    ARCHIVE.add(url, r.text, source="unblock.coffee")
     return r.text
 
 def download_video(url, save_path):
-    try:
-        print(f"⬇️ Downloading: {url}")
-        with requests.get(url, stream=True) as r:
-            r.raise_for_status()
-            with open(save_path, "wb") as f:
-                shutil.copyfileobj(r.raw, f)
-        print(f"✅ Saved to: {save_path}")
-    except Exception as e:
-        print(f"❌ Download failed: {e}")
+    # Checks Content-Length and the MP4 structure; a corrupt file is fetched again
+    return download_file(url, save_path)
 
 def sanitize(name):
     return "".join(c if c.isalnum() or c in "-_ " else "_" for c in name).strip()
@@ -157,10 +211,16 @@ def parse_campaign(relative_url, year):
     }
 
 def scrape_all():
-    for year, index_url in YEARLY_URLS.items():
+    try:
+        yearly_links = {}
+        for year, index_url in YEARLY_URLS.items():
+            yearly_links[year] = extract_campaign_links(index_url)
+    finally:
+        close_driver()
+
+    for year, links in yearly_links.items():
         print(f"\n📅 Year {year}")
         os.makedirs(str(year), exist_ok=True)
-        links = extract_campaign_links(index_url)
 
         for link in tqdm(links, desc=f"Scraping {year}"):
             data = parse_campaign(link, year)
@@ -174,14 +234,20 @@ def scrape_all():
             with open(os.path.join(campaign_folder, "metadata.json"), "w", encoding="utf-8") as f:
                 json.dump(data, f, indent=2)
 
+            if REPLAY:
+                continue
+
             # Save videos
             for i, vid in enumerate(data["videos"]):
                 video_url = vid.get("video_url")
                 if not video_url: continue
                 ext = video_url.split(".")[-1].split("?")[0]
                 path = os.path.join(campaign_folder, f"video_{i+1}.{ext}")
-                if not os.path.exists(path):
-                    download_video(video_url, path)
+                download_video(video_url, path)  # skips files already on disk that pass the integrity check
+
+    HTTP_CACHE.report()
+    ARCHIVE.report()
+    DOWNLOAD_STATS.report()
 
 if __name__ == "__main__":
     scrape_all()
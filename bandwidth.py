@@ -0,0 +1,120 @@
+"""
+Process-wide bandwidth scheduler with priority classes.
+
+Every media download reports its bytes to `SCHEDULER.consume(n, priority)`
+chunk by chunk. With a cap set, the scheduler is one byte bucket shared by
+all threads, and it hands out bandwidth strictly by class:
+
+    PAGE  (0)  page HTML fetched over HTTP
+    THUMB (1)  thumbnail files (`*_thumb.*`, see priority_for)
+    IMAGE (2)  campaign images
+    VIDEO (3)  video files
+
+A lower class only gets bytes while no higher class is waiting. Page loads
+that go through Chrome (which the scheduler cannot meter) are wrapped in
+`SCHEDULER.page_load()`. While one is in flight, images and videos are held
+to BACKGROUND_SHARE of the cap, so a 500 MB video cannot starve the crawl.
+
+    from bandwidth import SCHEDULER, VIDEO
+    SCHEDULER.configure(cap_mb_s=20)        # None = no cap (the default)
+
+    with SCHEDULER.page_load():
+        driver.get(url)
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+PAGE, THUMB, IMAGE, VIDEO = 0, 1, 2, 3
+CLASS_NAMES = ("page", "thumb", "image", "video")
+BANDWIDTH_CAP_MB = None  # MB/s for the whole process; None disables the scheduler
+BACKGROUND_SHARE = 0.25  # share of the cap left to images/videos while a page is loading
+BURST_SECONDS = 0.5  # bucket depth
+
+
+class BandwidthScheduler:
+    def __init__(self, cap_mb_s: Optional[float] = BANDWIDTH_CAP_MB, background_share: float = BACKGROUND_SHARE):
+        self._cond = threading.Condition()
+        self.background_share = background_share
+        self.waiting = [0, 0, 0, 0]
+        self.bytes = [0, 0, 0, 0]
+        self.waited = [0.0, 0.0, 0.0, 0.0]
+        self.pages_loading = 0
+        self.configure(cap_mb_s)
+
+    def configure(self, cap_mb_s: Optional[float]) -> None:
+        with self._cond:
+            self.cap = cap_mb_s * 1024 * 1024 if cap_mb_s else None
+            self.tokens = self.cap * BURST_SECONDS if self.cap else 0.0
+            self.updated = time.monotonic()
+            self._cond.notify_all()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.cap * BURST_SECONDS, self.tokens + (now - self.updated) * self.cap)
+        self.updated = now
+
+    def _cost(self, nbytes: int, priority: int) -> float:
+        if self.pages_loading and priority >= IMAGE:
+            return nbytes / self.background_share
+        return float(nbytes)
+
+    def consume(self, nbytes: int, priority: int = IMAGE) -> None:
+        """Account for `nbytes` just received, blocking until the class may have them."""
+        if self.cap is None:
+            with self._cond:
+                self.bytes[priority] += nbytes
+            return
+        started = time.monotonic()
+        with self._cond:
+            self.waiting[priority] += 1
+            try:
+                while True:
+                    if self.cap is None:
+                        break
+                    self._refill()
+                    outranked = any(self.waiting[p] for p in range(priority))
+                    if not outranked and self.tokens > 0:
+                        # May go negative for a chunk bigger than the bucket; the debt is paid by waiting
+                        self.tokens -= self._cost(nbytes, priority)
+                        break
+                    wait = -self.tokens / self.cap if self.tokens <= 0 else 0.05
+                    self._cond.wait(timeout=min(max(wait, 0.005), 0.25))
+            finally:
+                self.waiting[priority] -= 1
+                self._cond.notify_all()
+            self.bytes[priority] += nbytes
+            self.waited[priority] += time.monotonic() - started
+
+    @contextmanager
+    def page_load(self):
+        with self._cond:
+            self.pages_loading += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.pages_loading -= 1
+                self._cond.notify_all()
+
+    def report(self) -> None:
+        cap = f"{self.cap / (1024 * 1024):.1f} MB/s cap" if self.cap else "no cap"
+        parts = [
+            f"{name} {self.bytes[p] / (1024 * 1024):.1f} MB (waited {self.waited[p]:.0f}s)"
+            for p, name in enumerate(CLASS_NAMES) if self.bytes[p]
+        ]
+        print(f"🚦 Bandwidth ({cap}): " + (", ".join(parts) if parts else "nothing metered"))
+
+
+SCHEDULER = BandwidthScheduler()
+
+
+def priority_for(path) -> int:
+    """Default class for a download from its file name: video extension, `_thumb`, else image."""
+    name = str(path).lower()
+    if name.endswith((".mp4", ".webm", ".mkv", ".mov", ".avi", ".m4v")):
+        return VIDEO
+    if "_thumb" in name:
+        return THUMB
+    return IMAGE
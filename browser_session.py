@@ -0,0 +1,162 @@
+"""
+Browser-to-HTTP session handoff.
+
+Some sites (unblock.coffee) only need a real browser to get past the anti-bot
+front door; the pages behind it are plain server-rendered HTML. The
+`HandoffFetcher` clears the challenge once in Chrome, copies the browser's
+cookies and user agent into a pooled `requests.Session`, and serves every
+following page over HTTP. If a challenge shows up again the page is loaded
+in the browser instead and the session cookies are refreshed from it.
+
+    fetcher = HandoffFetcher(driver)
+    fetcher.warm_up("https://www.unblock.coffee/")
+    html = fetcher.get(url)
+    pages = fetcher.get_many(urls)   # {url: html or None}
+
+With an `archive` every fetched page is also appended to the snapshot
+archive, and `replay=True` serves pages from that archive only (no browser,
+no network) so parsers can be re-run offline.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter, Retry
+
+from bandwidth import SCHEDULER, PAGE
+from page_waits import wait_for_css
+from snapshot_archive import SnapshotArchive
+
+HTTP_WORKERS = 8
+REQUEST_TIMEOUT = 25
+
+CHALLENGE_STATUS = (403, 429, 503)
+CHALLENGE_MARKERS = (
+    "cf-browser-verification",
+    "challenge-platform",
+    "cf_chl_opt",
+    "<title>Just a moment...</title>",
+    "Attention Required! | Cloudflare",
+)
+
+
+def is_challenge(status: int, text: str) -> bool:
+    if status in CHALLENGE_STATUS:
+        return True
+    head = text[:20000]
+    return any(marker in head for marker in CHALLENGE_MARKERS)
+
+
+def session_from_driver(driver, session: Optional[requests.Session] = None,
+                        pool_size: int = HTTP_WORKERS * 2) -> requests.Session:
+    """Build (or refresh) a requests.Session carrying the browser's cookies and user agent."""
+    if session is None:
+        session = requests.Session()
+        retries = Retry(
+            total=2,
+            backoff_factor=0.5,
+            status_forcelist=(500, 502, 504),
+            allowed_methods=frozenset(["HEAD", "GET"])
+        )
+        adapter = HTTPAdapter(max_retries=retries, pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+    try:
+        user_agent = driver.execute_script("return navigator.userAgent;")
+    except Exception:
+        user_agent = None
+    if user_agent:
+        session.headers["User-Agent"] = user_agent
+    session.headers.setdefault("Accept-Language", "en-US,en;q=0.9")
+
+    for c in driver.get_cookies():
+        session.cookies.set(
+            c["name"],
+            c["value"],
+            domain=c.get("domain"),
+            path=c.get("path", "/"),
+            secure=c.get("secure", False),
+        )
+    return session
+
+
+class HandoffFetcher:
+    """
+    Fetch pages over HTTP with the browser's identity, falling back to the
+    browser itself when a challenge page comes back. With `enabled=False`
+    every page goes through the browser (the old behaviour).
+    """
+
+    def __init__(self, driver, enabled: bool = True, workers: int = HTTP_WORKERS,
+                 archive: Optional[SnapshotArchive] = None, replay: bool = False, source: Optional[str] = None):
+        self.driver = driver
+        self.enabled = enabled
+        self.workers = workers
+        self.archive = archive
+        self.replay = replay
+        self.source = source
+        self.session: Optional[requests.Session] = None
+        self._browser_lock = threading.Lock()
+        self.http_pages = 0
+        self.browser_pages = 0
+
+    def warm_up(self, url: str, ready_selector: Optional[str] = None, replaces: float = 0.0) -> str:
+        """Load `url` in the browser to clear the challenge, then hand the session off."""
+        return self._via_browser(url, ready_selector, replaces)
+
+    def _via_browser(self, url: str, ready_selector: Optional[str] = None, replaces: float = 0.0) -> str:
+        with self._browser_lock, SCHEDULER.page_load():
+            self.driver.get(url)
+            if ready_selector:
+                # `replaces` is the fixed sleep this wait stands in for, for WAIT_STATS
+                wait_for_css(self.driver, ready_selector, replaces=replaces)
+            html = self.driver.page_source
+            self.browser_pages += 1
+            if self.enabled:
+                self.session = session_from_driver(self.driver, self.session)
+        return html
+
+    def get(self, url: str, ready_selector: Optional[str] = None, replaces: float = 0.0) -> Optional[str]:
+        if self.replay:
+            html = self.archive.get(url) if self.archive else None
+            if html is None:
+                print(f"   ⚠️ No snapshot for {url}")
+            return html
+        html = self._fetch(url, ready_selector, replaces)
+        if html and self.archive is not None:
+            self.archive.add(url, html, source=self.source)
+        return html
+
+    def _fetch(self, url: str, ready_selector: Optional[str] = None, replaces: float = 0.0) -> Optional[str]:
+        if self.enabled and self.session is not None:
+            try:
+                r = self.session.get(url, timeout=REQUEST_TIMEOUT)
+                SCHEDULER.consume(len(r.content), PAGE)
+                if not is_challenge(r.status_code, r.text):
+                    r.raise_for_status()
+                    self.http_pages += 1
+                    return r.text
+                print(f"   🛡️ Challenge on {url} → using browser")
+            except requests.RequestException as e:
+                print(f"   ⚠️ HTTP fetch failed for {url} ({e}) → using browser")
+        try:
+            return self._via_browser(url, ready_selector, replaces)
+        except Exception as e:
+            print(f"   ❌ Browser fetch failed for {url}: {e}")
+            return None
+
+    def get_many(self, urls: Iterable[str], ready_selector: Optional[str] = None,
+                 replaces: float = 0.0) -> Dict[str, Optional[str]]:
+        """Fetch several pages concurrently; browser fallbacks are serialized."""
+        urls = list(dict.fromkeys(u for u in urls if u))
+        if not urls:
+            return {}
+        workers = self.workers if (self.enabled or self.replay) else 1
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pages = pool.map(lambda u: self.get(u, ready_selector, replaces), urls)
+            return dict(zip(urls, pages))
+
+    def report(self) -> None:
+        print(f"🌐 Pages over HTTP: {self.http_pages} | via browser: {self.browser_pages}")
@@ -0,0 +1,59 @@
+"""
+"Lean" Chrome profile for metadata-only crawls.
+
+The scrapers only read DOM attributes (titles, credits, media URLs) and
+download media separately afterwards, so there is no point letting Chrome
+fetch every image, font and video on the page. `enable_lean_mode` blocks
+those requests through DevTools URL blocking while leaving the page's own
+scripts and XHR untouched, so client-rendered content still appears.
+
+Works with both `webdriver.Chrome` and `uc.Chrome`:
+
+    driver = uc.Chrome(options=options)
+    enable_lean_mode(driver)
+"""
+from typing import Iterable
+
+BLOCKED_IMAGE_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico", "*.bmp",
+    "*fm=jpg*", "*fm=png*", "*fm=webp*",
+]
+BLOCKED_MEDIA_PATTERNS = [
+    "*.mp4", "*.webm", "*.mov", "*.m4v", "*.mkv", "*.m3u8", "*.mp3", "*.m4a",
+    "*video.adsoftheworld.com*",
+]
+BLOCKED_FONT_PATTERNS = ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot", "*fonts.gstatic.com*"]
+BLOCKED_ANALYTICS_PATTERNS = [
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*googlesyndication.com*", "*connect.facebook.net*", "*hotjar.com*",
+    "*clarity.ms*", "*linkedin.com/px*", "*snap.licdn.com*", "*ads-twitter.com*",
+]
+
+LEAN_BLOCKED_URLS = (
+    BLOCKED_IMAGE_PATTERNS
+    + BLOCKED_MEDIA_PATTERNS
+    + BLOCKED_FONT_PATTERNS
+    + BLOCKED_ANALYTICS_PATTERNS
+)
+
+
+def enable_lean_mode(driver, patterns: Iterable[str] = LEAN_BLOCKED_URLS) -> bool:
+    """
+    Block image/media/font/analytics requests for every page this driver
+    loads from now on. Returns False (and leaves the driver untouched) if the
+    DevTools commands are not available.
+    """
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(patterns)})
+        return True
+    except Exception as e:
+        print(f"[WARN] Lean mode unavailable, loading full pages: {e}")
+        return False
+
+
+def disable_lean_mode(driver) -> None:
+    try:
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": []})
+    except Exception:
+        pass
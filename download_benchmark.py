@@ -0,0 +1,91 @@
+"""
+Benchmark: old per-script download_file vs the shared media_downloader.
+
+By default it serves synthetic files from a local HTTP server so the numbers
+are reproducible; pass a file with one URL per line to measure real hosts:
+
+    python download_benchmark.py                 # 200 x 256 KB local files
+    python download_benchmark.py urls.txt        # real URLs
+"""
+import sys
+import tempfile
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+
+import media_downloader
+
+LOCAL_FILES = 200
+LOCAL_FILE_SIZE = 256 * 1024
+
+
+def legacy_download_file(url, dest_path: Path):
+    """The download_file copied across project6/project7 scripts before media_downloader."""
+    try:
+        if not url or dest_path.exists():
+            return
+        r = requests.get(url, timeout=20, stream=True)
+        if r.status_code == 200:
+            dest_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(dest_path, "wb") as f:
+                for chunk in r.iter_content(1024):
+                    f.write(chunk)
+    except Exception as e:
+        print(f"❌ Error downloading {url}: {e}")
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like real CDNs
+
+    def log_message(self, *args):
+        pass
+
+
+def serve_local_files(root: Path):
+    for i in range(LOCAL_FILES):
+        (root / f"f{i}.bin").write_bytes(bytes([i % 256]) * LOCAL_FILE_SIZE)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(QuietHandler, directory=str(root)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    return server, [f"{base}/f{i}.bin" for i in range(LOCAL_FILES)]
+
+
+def run(label, fn, urls, out_dir: Path):
+    start = time.perf_counter()
+    for i, url in enumerate(urls):
+        fn(url, out_dir / f"{i}.bin")
+    elapsed = time.perf_counter() - start
+    total = sum(p.stat().st_size for p in out_dir.glob("*.bin"))
+    mb = total / (1024 * 1024)
+    print(f"{label:<10} {len(urls)} files, {mb:.1f} MB in {elapsed:.2f}s → "
+          f"{len(urls) / elapsed:.1f} files/s, {mb / elapsed:.1f} MB/s")
+    return elapsed
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        server = None
+        if len(sys.argv) > 1:
+            urls = [u.strip() for u in Path(sys.argv[1]).read_text(encoding="utf-8").splitlines() if u.strip()]
+        else:
+            src = tmp / "src"
+            src.mkdir()
+            server, urls = serve_local_files(src)
+
+        (tmp / "before").mkdir()
+        (tmp / "after").mkdir()
+        before = run("before", legacy_download_file, urls, tmp / "before")
+        after = run("after", partial(media_downloader.download_file, quiet=True), urls, tmp / "after")
+        print(f"speedup    {before / after:.2f}x")
+
+        if server:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
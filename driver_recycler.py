@@ -0,0 +1,164 @@
+"""
+Automatic Chrome recycling for long runs.
+
+Chrome's memory keeps growing over thousands of page loads until the machine
+swaps or chromedriver dies mid-run. `RecyclingDriver` wraps a driver factory
+and transparently tears the browser down and starts a fresh one:
+
+  * every `every` page loads,
+  * when Chrome + chromedriver RSS goes over `max_rss_mb` (needs psutil),
+  * when a WebDriver error leaves the browser unresponsive.
+
+Cookies are carried over to the new browser. Everything else is delegated to
+the current driver, so it can be used wherever a driver is expected:
+
+    driver = RecyclingDriver(make_driver, every=300, max_rss_mb=2500)
+    driver.get(url)
+    soup = BeautifulSoup(driver.page_source, "html.parser")
+"""
+import time
+from urllib.parse import urlparse
+
+from selenium.common.exceptions import WebDriverException
+
+try:
+    import psutil
+except ImportError:  # RSS-based recycling is skipped without psutil
+    psutil = None
+
+RECYCLE_EVERY = 300  # page loads
+MAX_RSS_MB = 2500
+RSS_CHECK_EVERY = 10  # page loads between memory checks
+BLANK = "about:blank"
+
+
+class RecyclingDriver:
+    def __init__(self, factory, every: int = RECYCLE_EVERY, max_rss_mb: float = MAX_RSS_MB):
+        self._factory = factory
+        self._every = every
+        self._max_rss_mb = max_rss_mb
+        self._pages = 0
+        self.restarts = 0
+        self.driver = factory()
+        if max_rss_mb and psutil is None:
+            print("ℹ️ psutil not installed → memory-based Chrome recycling disabled")
+
+    def __getattr__(self, name):
+        if name == "driver":
+            raise AttributeError(name)
+        return getattr(self.driver, name)
+
+    # ---------- policy ----------
+    def rss_mb(self) -> float:
+        """Resident memory of chromedriver, Chrome and all their child processes."""
+        if psutil is None:
+            return 0.0
+        pids = set()
+        for pid in (getattr(self.driver, "browser_pid", None),
+                    getattr(getattr(getattr(self.driver, "service", None), "process", None), "pid", None)):
+            if not pid:
+                continue
+            try:
+                proc = psutil.Process(pid)
+                pids.add(proc.pid)
+                pids.update(c.pid for c in proc.children(recursive=True))
+            except psutil.Error:
+                continue
+        total = 0
+        for pid in pids:
+            try:
+                total += psutil.Process(pid).memory_info().rss
+            except psutil.Error:
+                continue
+        return total / (1024 * 1024)
+
+    def _recycle_reason(self):
+        if self._every and self._pages >= self._every:
+            return f"{self._pages} pages"
+        if self._max_rss_mb and psutil is not None and self._pages % RSS_CHECK_EVERY == 0:
+            rss = self.rss_mb()
+            if rss > self._max_rss_mb:
+                return f"RSS {rss:.0f} MB"
+        return None
+
+    def is_alive(self) -> bool:
+        try:
+            _ = self.driver.current_url
+            return True
+        except Exception:
+            return False
+
+    # ---------- restart ----------
+    def recycle(self, reason: str) -> None:
+        print(f"♻️ Restarting Chrome ({reason})")
+        cookies, origin = [], None
+        try:
+            cookies = self.driver.get_cookies()
+            u = urlparse(self.driver.current_url)
+            if u.scheme in ("http", "https"):
+                origin = f"{u.scheme}://{u.netloc}/"
+        except Exception:
+            pass
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+
+        for attempt in range(1, 4):
+            try:
+                self.driver = self._factory()
+                break
+            except Exception as e:
+                print(f"⚠️ Chrome restart attempt {attempt} failed: {e}")
+                time.sleep(3 * attempt)
+        else:
+            raise RuntimeError("Could not restart Chrome")
+
+        self._pages = 0
+        self.restarts += 1
+        if cookies and origin:
+            self._restore_cookies(origin, cookies)
+
+    def _restore_cookies(self, origin: str, cookies) -> None:
+        try:
+            self.driver.get(origin)
+        except Exception:
+            return
+        restored = 0
+        for c in cookies:
+            c = {k: v for k, v in c.items() if k in ("name", "value", "domain", "path", "secure", "httpOnly", "expiry")}
+            try:
+                self.driver.add_cookie(c)
+                restored += 1
+            except Exception:
+                continue
+        print(f"   🍪 Restored {restored}/{len(cookies)} cookies")
+
+    # ---------- navigation ----------
+    def get(self, url: str) -> None:
+        """
+        Load `url`, recycling first if the policy says so. If the load fails
+        because the browser died, restart it and load `url` once more on the
+        fresh driver; only a failure there reaches the caller. `about:blank`
+        resets do not count toward the recycle-every-N page budget.
+        """
+        counts = url != BLANK
+        if counts:
+            reason = self._recycle_reason()
+            if reason:
+                self.recycle(reason)
+        try:
+            self.driver.get(url)
+        except WebDriverException:
+            if self.is_alive():
+                raise
+            self.recycle("WebDriver died")
+            self.driver.get(url)
+        if counts:
+            self._pages += 1
+
+    def quit(self) -> None:
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
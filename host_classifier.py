@@ -0,0 +1,116 @@
+"""
+Learned host classification for video URLs, persisted across runs.
+
+Video URLs without a known file extension used to get a HEAD request each to
+find out whether they are a direct file, even though they come from the same
+handful of CDNs. Every HEAD answer is now recorded per host and per
+host + first path segment; once a key has MIN_SAMPLES answers that all agree,
+later URLs are classified without a request.
+
+Classes: "direct" (serves the file), "ytdlp" (an HTML page yt-dlp extracts),
+"not_video" (anything else).
+
+    HOST_CLASSES = HostClassifier("host_classes.json")
+
+    known = HOST_CLASSES.classify(url)          # None until the host is learned
+    if known is None:
+        ...HEAD...
+        HOST_CLASSES.observe(url, "direct")
+"""
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+HOST_CLASSES_FILE = "host_classes.json"
+CLASSES = ("direct", "ytdlp", "not_video")
+MIN_SAMPLES = 3
+SAVE_EVERY = 20
+
+
+def classify_content_type(content_type: str, octet_stream_is_video: bool = True) -> str:
+    ct = (content_type or "").lower()
+    if ct.startswith("video/") or (octet_stream_is_video and "octet-stream" in ct):
+        return "direct"
+    if ct.startswith("text/html"):
+        return "ytdlp"
+    return "not_video"
+
+
+def _keys(url: str) -> List[str]:
+    """Most specific first: host/first-segment, then host."""
+    u = urlparse(url)
+    host = u.netloc.lower()
+    segments = [s for s in u.path.split("/") if s]
+    keys = []
+    if len(segments) > 1:
+        keys.append(f"{host}/{segments[0]}")
+    keys.append(host)
+    return keys
+
+
+class HostClassifier:
+    def __init__(self, path: str = HOST_CLASSES_FILE, min_samples: int = MIN_SAMPLES):
+        self.path = Path(path)
+        self.min_samples = min_samples
+        self.counts: Dict[str, Dict[str, int]] = self._load()
+        self.heads_avoided = 0
+        self.heads_sent = 0
+        self._unsaved = 0
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dict[str, int]]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self) -> None:
+        with self._lock:
+            snapshot = {k: dict(v) for k, v in self.counts.items()}
+            self._unsaved = 0
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def _learned(self, key: str) -> Optional[str]:
+        counts = self.counts.get(key)
+        if not counts:
+            return None
+        seen = [c for c, n in counts.items() if n]
+        if len(seen) == 1 and counts[seen[0]] >= self.min_samples:
+            return seen[0]
+        return None  # too few samples, or the key behaves inconsistently
+
+    def classify(self, url: str) -> Optional[str]:
+        """The learned class for this URL's host pattern, counting it as an avoided HEAD; None means probe."""
+        with self._lock:
+            for key in _keys(url):
+                learned = self._learned(key)
+                if learned:
+                    self.heads_avoided += 1
+                    return learned
+            self.heads_sent += 1
+            return None
+
+    def observe(self, url: str, cls: str) -> None:
+        if cls not in CLASSES:
+            return
+        with self._lock:
+            for key in _keys(url):
+                counts = self.counts.setdefault(key, {})
+                counts[cls] = counts.get(cls, 0) + 1
+            self._unsaved += 1
+            flush = self._unsaved >= SAVE_EVERY
+        if flush:
+            self.save()
+
+    def report(self) -> None:
+        self.save()
+        learned = sum(1 for k in self.counts if self._learned(k))
+        print(f"🧭 Host classes: {self.heads_avoided} HEAD requests avoided, {self.heads_sent} sent | "
+              f"{learned} host patterns learned in {self.path}")
@@ -0,0 +1,139 @@
+"""
+Adaptive per-host rate limiting for requests sessions.
+
+Each host gets a token bucket whose rate follows AIMD (additive increase,
+multiplicative decrease): every healthy response nudges the rate up, a 429
+or 503 halves it (and honours Retry-After), and responses much slower than
+the host's usual latency back it off gently. Throughput converges to what
+each host tolerates instead of a fixed guess.
+
+Mount the adapter on a session and every call through it is throttled:
+
+    limiter = AdaptiveRateLimiter()
+    adapter = ThrottledAdapter(limiter, max_retries=retries, pool_maxsize=32)
+    session.mount("https://", adapter)
+"""
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from requests.adapters import HTTPAdapter
+
+INITIAL_RATE = 4.0  # requests/second per host
+MIN_RATE = 0.2
+MAX_RATE = 50.0
+ADDITIVE_STEP = 0.25  # req/s added per healthy response
+BACKOFF_FACTOR = 0.5  # on 429/503
+SLOW_FACTOR = 0.85  # on a response much slower than usual
+SLOW_RATIO = 3.0  # "much slower" = latency over this multiple of the host's EWMA
+LATENCY_ALPHA = 0.2
+THROTTLE_STATUS = (429, 503)
+THROTTLE_RETRIES = 4  # extra attempts for a throttled request, each paced by the bucket
+MAX_RETRY_AFTER = 120.0
+
+
+def _retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class HostBucket:
+    def __init__(self, host: str, rate: float = INITIAL_RATE):
+        self.host = host
+        self.rate = rate
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.latency = None  # EWMA seconds
+        self.requests = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now >= self.blocked_until:
+                    capacity = max(1.0, self.rate)
+                    self.tokens = min(capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1.0:
+                        self.tokens -= 1.0
+                        self.requests += 1
+                        return
+                    wait = (1.0 - self.tokens) / self.rate
+                else:
+                    wait = self.blocked_until - now
+            time.sleep(wait)
+
+    def observe(self, status: Optional[int], latency: float, retry_after: Optional[float] = None) -> None:
+        with self._lock:
+            if status in THROTTLE_STATUS or status is None:
+                self.throttled += 1
+                self.rate = max(MIN_RATE, self.rate * BACKOFF_FACTOR)
+                self.tokens = 0.0
+                if retry_after:
+                    self.blocked_until = time.monotonic() + min(retry_after, MAX_RETRY_AFTER)
+                return
+            if self.latency is not None and latency > self.latency * SLOW_RATIO:
+                self.rate = max(MIN_RATE, self.rate * SLOW_FACTOR)
+            else:
+                self.rate = min(MAX_RATE, self.rate + ADDITIVE_STEP)
+            self.latency = latency if self.latency is None else (
+                LATENCY_ALPHA * latency + (1 - LATENCY_ALPHA) * self.latency
+            )
+
+
+class AdaptiveRateLimiter:
+    def __init__(self, initial_rate: float = INITIAL_RATE):
+        self.initial_rate = initial_rate
+        self._buckets: Dict[str, HostBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, host: str) -> HostBucket:
+        with self._lock:
+            b = self._buckets.get(host)
+            if b is None:
+                b = self._buckets[host] = HostBucket(host, self.initial_rate)
+            return b
+
+    def report(self) -> None:
+        for host, b in sorted(self._buckets.items()):
+            latency = f"{b.latency * 1000:.0f} ms" if b.latency is not None else "n/a"
+            print(f"[RATE] {host}: {b.rate:.2f} req/s | {b.requests} requests | "
+                  f"{b.throttled} throttled | latency {latency}")
+
+
+class ThrottledAdapter(HTTPAdapter):
+    """HTTPAdapter that paces requests per host and adapts to 429/503 and latency."""
+
+    def __init__(self, limiter: AdaptiveRateLimiter, *args, **kwargs):
+        self.limiter = limiter
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        bucket = self.limiter.bucket(urlparse(request.url).netloc.lower())
+        for attempt in range(THROTTLE_RETRIES + 1):
+            bucket.acquire()
+            start = time.monotonic()
+            try:
+                resp = super().send(request, **kwargs)
+            except Exception:
+                bucket.observe(None, time.monotonic() - start)
+                raise
+            retry_after = _retry_after_seconds(resp.headers.get("Retry-After"))
+            bucket.observe(resp.status_code, time.monotonic() - start, retry_after)
+            if resp.status_code not in THROTTLE_STATUS or attempt == THROTTLE_RETRIES:
+                return resp
+            resp.close()
+        return resp
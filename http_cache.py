@@ -0,0 +1,228 @@
+"""
+On-disk HTTP cache with conditional revalidation.
+
+Re-crawls fetch the same pages again. `CachingAdapter` keeps the
+body of every GET that came back with an ETag or Last-Modified, and the next
+time the URL is requested sends If-None-Match / If-Modified-Since. A 304 is
+answered from disk, so an unchanged page costs a round trip instead of a
+full body. Callers see an ordinary 200 response either way.
+
+    cache = HttpCache(".http_cache")
+    session.mount("https://", CachingAdapter(cache=cache))
+
+Large bodies and media are never stored (see MAX_BODY_BYTES and
+SKIP_CONTENT_TYPES): images already live in the campaign folders and the
+content store, and skip_existing / the URL index avoid refetching them, so a
+second copy here would only double their disk use. The adapter can be
+combined with other adapters through multiple inheritance:
+
+    class SessionAdapter(CachingAdapter, ThrottledAdapter):
+        pass
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from requests.adapters import HTTPAdapter
+
+HTTP_CACHE_DIR = ".http_cache"
+MAX_BODY_BYTES = 8 * 1024 * 1024
+SKIP_CONTENT_TYPES = ("video/", "audio/", "image/")  # media is kept once, by the downloaders
+KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Cache-Control", "Expires")
+
+
+class HttpCache:
+    def __init__(self, root: str = HTTP_CACHE_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.revalidated = 0
+        self.stored = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+
+    def _paths(self, url: str):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        sub = self.root / key[:2]
+        return sub / f"{key}.json", sub / f"{key}.body"
+
+    def lookup(self, url: str) -> Optional[dict]:
+        meta_path, body_path = self._paths(url)
+        if not meta_path.exists() or not body_path.exists():
+            return None
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if meta.get("url") != url:
+            return None
+        meta["body_path"] = str(body_path)
+        return meta
+
+    def open_writer(self, url: str, headers) -> "CacheWriter":
+        return CacheWriter(self, url, headers)
+
+    def commit(self, url: str, tmp_body: Path, headers) -> None:
+        meta_path, body_path = self._paths(url)
+        meta = {
+            "url": url,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "headers": {k: headers[k] for k in KEPT_HEADERS if k in headers},
+            "stored": time.time(),
+        }
+        meta_path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp_body, body_path)
+        tmp_meta = meta_path.with_suffix(".json.tmp")
+        tmp_meta.write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(tmp_meta, meta_path)
+        with self._lock:
+            self.stored += 1
+
+    def record_hit(self, size: int) -> None:
+        with self._lock:
+            self.revalidated += 1
+            self.bytes_saved += size
+
+    def report(self) -> None:
+        print(f"[CACHE] {self.revalidated} responses revalidated (304), "
+              f"{self.bytes_saved / (1024 * 1024):.1f} MB not re-downloaded, {self.stored} bodies stored")
+
+
+class CacheWriter:
+    """Copies a response body to a temp file as it is read; committed only on a full read."""
+
+    def __init__(self, cache: HttpCache, url: str, headers):
+        self.cache = cache
+        self.url = url
+        self.headers = headers
+        _, body_path = cache._paths(url)
+        body_path.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp = body_path.with_name(f"{body_path.name}.{threading.get_ident()}.tmp")
+        self.f = open(self.tmp, "wb")
+        self.size = 0
+        self.done = False
+
+    def write(self, data: bytes) -> None:
+        if self.done or not data:
+            return
+        self.size += len(data)
+        if self.size > MAX_BODY_BYTES:
+            self.abort()
+            return
+        self.f.write(data)
+
+    def finish(self) -> None:
+        if self.done:
+            return
+        self.done = True
+        self.f.close()
+        try:
+            self.cache.commit(self.url, self.tmp, self.headers)
+        except OSError:
+            self.abort()
+
+    def abort(self) -> None:
+        if self.done and self.f.closed and not self.tmp.exists():
+            return
+        self.done = True
+        try:
+            self.f.close()
+            self.tmp.unlink()
+        except OSError:
+            pass
+
+
+class _TeeRaw:
+    """Wraps urllib3's response so whatever requests reads is also written to the cache."""
+
+    def __init__(self, raw, writer: CacheWriter):
+        self._raw = raw
+        self._writer = writer
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def stream(self, amt=2 ** 16, decode_content=None):
+        completed = False
+        try:
+            for chunk in self._raw.stream(amt, decode_content=True):
+                self._writer.write(chunk)
+                yield chunk
+            completed = True
+        finally:
+            if completed:
+                self._writer.finish()
+            else:
+                self._writer.abort()
+
+    def read(self, amt=None, decode_content=None, **kwargs):
+        data = self._raw.read(amt, decode_content=True, **kwargs)
+        if data:
+            self._writer.write(data)
+        if not data or amt is None:
+            self._writer.finish()
+        return data
+
+    def close(self):
+        if not self._writer.done:
+            self._writer.abort()
+        self._raw.close()
+
+
+class CachingAdapter(HTTPAdapter):
+    def __init__(self, *args, cache: Optional[HttpCache] = None, **kwargs):
+        self.cache = cache
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        if self.cache is None or request.method != "GET":
+            return super().send(request, **kwargs)
+
+        entry = self.cache.lookup(request.url)
+        if entry:
+            if entry.get("etag"):
+                request.headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                request.headers["If-Modified-Since"] = entry["last_modified"]
+
+        resp = super().send(request, **kwargs)
+
+        if resp.status_code == 304 and entry:
+            return self._from_cache(resp, entry)
+        if resp.status_code == 200:
+            self._maybe_store(resp, request.url)
+        return resp
+
+    def _from_cache(self, resp, entry):
+        resp.close()
+        body_path = entry["body_path"]
+        size = os.path.getsize(body_path)
+        resp.status_code = 200
+        resp.reason = "OK (revalidated)"
+        for k, v in entry.get("headers", {}).items():
+            resp.headers[k] = v
+        resp.headers.pop("Content-Encoding", None)
+        resp.headers["Content-Length"] = str(size)
+        resp.raw = open(body_path, "rb")
+        resp.from_cache = True
+        self.cache.record_hit(size)
+        return resp
+
+    def _maybe_store(self, resp, url):
+        headers = resp.headers
+        if not (headers.get("ETag") or headers.get("Last-Modified")):
+            return
+        if "no-store" in headers.get("Cache-Control", "").lower():
+            return
+        if headers.get("Content-Type", "").lower().startswith(SKIP_CONTENT_TYPES):
+            return
+        try:
+            if int(headers.get("Content-Length", 0)) > MAX_BODY_BYTES:
+                return
+        except ValueError:
+            return
+        resp.raw = _TeeRaw(resp.raw, self.cache.open_writer(url, headers))
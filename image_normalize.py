@@ -0,0 +1,220 @@
+"""
+Post-download image normalization: every image ends up a real JPEG.
+
+The scrapers name images `*.jpg` whatever the server sent. El Ojo serves
+AVIF, leclubdesda covers are PNG even with `?fm=jpg`, and some CDNs return
+WebP, so a delivery contains many "JPEGs" that are not JPEG at all. This
+stage sniffs each file's real format from its first bytes and converts on
+all cores in a process pool:
+
+  * `*.jpg` / `*.jpeg` that are really PNG/WebP/AVIF are re-encoded in place
+    (same name, so the campaign JSON and folder layout stay valid),
+  * `*.avif` / `*.webp` / `*.png` files (project3new2 saves leclubdesda
+    covers as .png) are converted to a `.jpg` next to them; transparency is
+    flattened onto white. The original is kept: the scrapers' skip checks
+    and the URL index look for it, and removing it would have the next
+    scrape download it again,
+  * real JPEGs, GIFs (often animated) and non-images are left alone.
+
+Files already checked are listed, with size and mtime, in a marker file
+(NORMALIZED_FILE) at the root, so a re-run only opens new or changed files.
+
+    python image_normalize.py D:\\Media\\Ads\\adsoftheworld            # all cores
+    python image_normalize.py El_Ojo --workers 4
+
+Needs Pillow; AVIF needs Pillow >= 11.3 or the pillow-avif-plugin package,
+HEIC needs pillow-heif. Formats Pillow cannot open are counted as
+unsupported and retried on the next run.
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from PIL import Image
+except ImportError:  # the stage reports and exits without Pillow
+    Image = None
+
+try:
+    import pillow_avif  # noqa: F401  (registers the AVIF plugin)
+except ImportError:
+    pass
+
+try:
+    from pillow_heif import register_heif_opener
+    register_heif_opener()
+except ImportError:
+    pass
+
+NORMALIZED_FILE = ".normalized.json"
+JPEG_QUALITY = 90
+JPEG_NAMES = (".jpg", ".jpeg")
+CONVERT_NAMES = (".avif", ".webp", ".png")  # converted to a sibling .jpg
+CANDIDATE_NAMES = JPEG_NAMES + CONVERT_NAMES
+CHUNKSIZE = 32  # files per task sent to a worker
+SAVE_EVERY = 500  # results between writes of the marker file
+BACKGROUND = (255, 255, 255)  # transparent pixels are flattened onto white
+
+
+def sniff_format(head: bytes) -> Optional[str]:
+    """Real image format from the first 16 bytes, whatever the file is called."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head.startswith((b"GIF87a", b"GIF89a")):
+        return "gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    if head[4:8] == b"ftyp":
+        brand = head[8:12]
+        if brand in (b"avif", b"avis"):
+            return "avif"
+        if brand in (b"heic", b"heix", b"mif1", b"msf1"):
+            return "heic"
+    return None
+
+
+def _to_rgb(img):
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        img = img.convert("RGBA")
+        flat = Image.new("RGB", img.size, BACKGROUND)
+        flat.paste(img, mask=img.getchannel("A"))
+        return flat
+    return img.convert("RGB") if img.mode != "RGB" else img
+
+
+def normalize_one(path: str) -> Tuple[str, str, Optional[str], str]:
+    """
+    Runs in a worker process. Returns (path, status, final path, detail);
+    status is "jpeg", "converted", "cached" (the sibling .jpg already
+    exists), "left" (not ours to convert), "unsupported" (Pillow cannot
+    decode it here) or "failed".
+    """
+    src = Path(path)
+    try:
+        with open(src, "rb") as f:
+            fmt = sniff_format(f.read(16))
+    except OSError as e:
+        return path, "failed", None, str(e)
+    if fmt not in ("jpeg", "png", "webp", "avif", "heic"):
+        return path, "left", path, fmt or "not an image"
+    dest = src if src.suffix.lower() in JPEG_NAMES else src.with_suffix(".jpg")
+    if dest == src and fmt == "jpeg":
+        return path, "jpeg", path, ""
+    if dest != src and dest.exists() and dest.stat().st_mtime_ns >= src.stat().st_mtime_ns:
+        return path, "cached", str(dest), ""  # converted on an earlier run
+    if fmt == "jpeg":
+        # A JPEG under the wrong name only needs a second name, not re-encoding
+        tmp = dest.with_name(dest.name + ".norm")
+        try:
+            os.link(src, tmp)
+        except OSError:
+            shutil.copyfile(src, tmp)
+        os.replace(tmp, dest)
+        return path, "converted", str(dest), "linked"
+    tmp = dest.with_name(dest.name + ".norm")
+    try:
+        with Image.open(src) as img:
+            img.load()
+            _to_rgb(img).save(tmp, "JPEG", quality=JPEG_QUALITY)
+    except (OSError, ValueError) as e:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        status = "unsupported" if "cannot identify" in str(e) else "failed"
+        return path, status, None, f"{fmt}: {e}"
+    os.replace(tmp, dest)  # replaces rather than rewrites, so a hardlinked store blob is left intact
+    return path, "converted", str(dest), fmt
+
+
+def _load_markers(marker_path: Path) -> Dict[str, List[int]]:
+    try:
+        with open(marker_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_markers(marker_path: Path, markers: Dict[str, List[int]]) -> None:
+    tmp = marker_path.with_name(marker_path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(markers, f)
+    os.replace(tmp, marker_path)
+
+
+def _stamp(path: Path) -> List[int]:
+    st = path.stat()
+    return [st.st_size, st.st_mtime_ns]
+
+
+def pending_images(root: Path, markers: Dict[str, List[int]]) -> Tuple[List[str], int]:
+    """Candidate images that are new or changed since they were last normalized, and how many are not."""
+    todo, cached = [], 0
+    for dirpath, _dirs, files in os.walk(root):
+        for name in files:
+            if not name.lower().endswith(CANDIDATE_NAMES):
+                continue
+            p = Path(dirpath) / name
+            if markers.get(p.relative_to(root).as_posix()) == _stamp(p):
+                cached += 1
+            else:
+                todo.append(str(p))
+    return todo, cached
+
+
+def normalize_tree(root, workers: Optional[int] = None) -> Dict[str, int]:
+    """Normalize every image under `root` in a process pool. Returns counts per status."""
+    counts = {"jpeg": 0, "converted": 0, "left": 0, "unsupported": 0, "failed": 0, "cached": 0}
+    if Image is None:
+        print("⚠️ Pillow not installed (pip install Pillow) → image normalization skipped")
+        return counts
+    root = Path(root)
+    marker_path = root / NORMALIZED_FILE
+    markers = _load_markers(marker_path)
+    todo, counts["cached"] = pending_images(root, markers)
+    print(f"🖼️ {len(todo)} images to check under {root} ({counts['cached']} already normalized)")
+    if not todo:
+        return counts
+
+    started = time.monotonic()
+    unsaved = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for done, (path, status, final, detail) in enumerate(
+                pool.map(normalize_one, todo, chunksize=CHUNKSIZE), start=1):
+            counts[status] += 1
+            rel = Path(path).relative_to(root).as_posix()
+            if status in ("jpeg", "converted", "cached", "left"):
+                markers[rel] = _stamp(Path(path))
+                if final != path:
+                    markers[Path(final).relative_to(root).as_posix()] = _stamp(Path(final))
+                unsaved += 1
+            elif status == "failed":
+                print(f"   ❌ {rel}: {detail}")
+            if unsaved >= SAVE_EVERY:
+                _save_markers(marker_path, markers)
+                unsaved = 0
+            if done % 1000 == 0:
+                print(f"   … {done}/{len(todo)} ({done / (time.monotonic() - started):.0f} files/s)")
+    _save_markers(marker_path, markers)
+
+    elapsed = max(time.monotonic() - started, 1e-6)
+    print(f"✅ Normalized in {elapsed:.0f}s ({len(todo) / elapsed:.0f} files/s): {counts['converted']} converted, "
+          f"{counts['jpeg']} already JPEG, {counts['cached']} already converted, {counts['left']} left as is, "
+          f"{counts['unsupported']} unsupported, {counts['failed']} failed")
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert AVIF/WebP/PNG images (and mislabeled .jpg) to real JPEG.")
+    parser.add_argument("root", nargs="+", help="download folder(s) to normalize")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    args = parser.parse_args()
+    for folder in args.root:
+        normalize_tree(folder, workers=args.workers)
@@ -0,0 +1,528 @@
+"""
+Shared media downloader for all scrapers.
+
+Replaces the per-script `download_file` copies, which opened a new TCP+TLS
+connection for every file (bare `requests.get`) and wrote 1 KB chunks.
+Here every download goes through one pooled `requests.Session` (keep-alive
+connections reused per host), is streamed in large chunks through a
+buffered writer into `<name>.part`, and is renamed into place only once
+complete, so an interrupted run never leaves a truncated file under the
+final name.
+
+An interrupted download leaves `<name>.part` next to `<name>.part.json`,
+which records the server's validator (strong ETag or Last-Modified) and the
+full length. The next attempt asks for the rest with `Range` + `If-Range`;
+if the file changed on the server, or the server ignores ranges, it answers
+200 and the download restarts from zero.
+
+Large direct videos (over SEGMENT_THRESHOLD) can instead be fetched with
+`download_large_file`, which splits the file into SEGMENTS ranged requests on
+parallel connections, each writing at its own offset into a preallocated
+`.part`. Servers without range support fall back to the single stream.
+
+Every chunk is metered through bandwidth.SCHEDULER, which applies the
+process-wide cap and the page > thumbnail > image > video priorities; the
+class defaults to one guessed from the file name.
+
+With `use_content_store(root)` every finished download is hashed (while
+streaming; segmented files once after assembly) and handed to
+media_store.ContentStore, so identical files share one copy via hardlinks.
+
+MP4/MOV downloads are also checked structurally while they stream
+(media_verify: the top-level boxes must cover the file and include moov).
+A file that fails is discarded and fetched again from zero, and so is a
+corrupt file found by `skip_existing`; DOWNLOAD_STATS lists what was repaired.
+Content that is not ISO-BMFF at all (WebM, HLS, HTML under a .mp4 name) is
+kept as served and never retried.
+
+With `use_url_index(path)` download_file first looks the URL up in a
+persistent url_index.UrlIndex and hardlinks the file saved for it earlier
+(another campaign, another run) instead of downloading it again.
+
+    from media_downloader import download_file
+
+    download_file(url, project_dir / "name_1.jpg")              # -> True/False
+    download_file(url, dest, headers={"Referer": page_url})
+
+DOWNLOAD_STATS.report() prints files/s and MB/s for the run.
+"""
+import json
+import os
+import platform
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter, Retry
+
+from bandwidth import SCHEDULER, VIDEO, priority_for
+from media_store import HASH_CHUNK, ContentStore, hash_file, new_hasher
+from media_verify import verifier_for, verify_file
+from url_index import UrlIndex
+
+CHUNK_SIZE = 1024 * 1024  # 1 MB reads from the socket
+WRITE_BUFFER = 4 * 1024 * 1024
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 60
+POOL_SIZE = 32  # keep-alive connections kept per host
+SEGMENT_THRESHOLD = 32 * 1024 * 1024  # files at least this big are split into ranged segments
+SEGMENTS = 4  # parallel connections per segmented file
+SEGMENT_RETRIES = 3
+REPAIR_RETRIES = 1  # fresh re-downloads of a file that arrived corrupt
+DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/116.0.0.0 Safari/537.36"
+    )
+}
+
+
+def windows_longpath(p: Path) -> str:
+    if platform.system().lower().startswith("win"):
+        try:
+            p_abs = p if p.is_absolute() else p.resolve(strict=False)
+        except Exception:
+            p_abs = (Path.cwd() / p)
+        p_str = str(p_abs)
+        if p_str.startswith("\\\\?\\"):
+            return p_str
+        return "\\\\?\\" + p_str
+    return str(p)
+
+
+def make_download_session(pool_size: int = POOL_SIZE) -> requests.Session:
+    s = requests.Session()
+    retries = Retry(
+        total=3,
+        backoff_factor=0.8,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["HEAD", "GET"])
+    )
+    adapter = HTTPAdapter(max_retries=retries, pool_connections=pool_size, pool_maxsize=pool_size)
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    s.headers.update(DEFAULT_HEADERS)
+    return s
+
+
+SESSION = make_download_session()
+
+
+class DownloadStats:
+    def __init__(self):
+        self.files = 0
+        self.failed = 0
+        self.skipped = 0
+        self.bytes = 0
+        self.resumed = 0
+        self.resumed_bytes = 0
+        self.repaired: List[Tuple[str, str]] = []  # (path, what was wrong) for files fetched again
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add(self, files: int = 0, failed: int = 0, skipped: int = 0, nbytes: int = 0,
+            resumed: int = 0, resumed_bytes: int = 0) -> None:
+        with self._lock:
+            self.files += files
+            self.failed += failed
+            self.skipped += skipped
+            self.bytes += nbytes
+            self.resumed += resumed
+            self.resumed_bytes += resumed_bytes
+
+    def add_repaired(self, path, reason: str) -> None:
+        with self._lock:
+            self.repaired.append((str(path), reason))
+
+    def report(self) -> None:
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        mb = self.bytes / (1024 * 1024)
+        print(f"📦 Downloads: {self.files} ok, {self.failed} failed, {self.skipped} skipped | "
+              f"{mb:.1f} MB in {elapsed:.0f}s ({self.files / elapsed:.2f} files/s, {mb / elapsed:.2f} MB/s)")
+        if self.resumed:
+            print(f"↪️ Resumed {self.resumed} partial downloads, "
+                  f"{self.resumed_bytes / (1024 * 1024):.1f} MB not re-downloaded")
+        if self.repaired:
+            print(f"🩹 Repaired {len(self.repaired)} corrupt files:")
+            for path, reason in self.repaired:
+                print(f"   {path}: {reason}")
+
+
+DOWNLOAD_STATS = DownloadStats()
+STORE: Optional[ContentStore] = None
+URL_INDEX: Optional[UrlIndex] = None
+
+
+def use_content_store(root) -> ContentStore:
+    """Store downloads by content hash under `root` (same volume as the output folders) and hardlink them."""
+    global STORE
+    STORE = ContentStore(root, longpath=windows_longpath)
+    return STORE
+
+
+def use_url_index(path) -> UrlIndex:
+    """Reuse files already downloaded for the same URL (hardlinked) instead of fetching them again."""
+    global URL_INDEX
+    URL_INDEX = UrlIndex(path, longpath=windows_longpath)
+    return URL_INDEX
+
+
+def _replay(path: Path, hasher, verifier) -> None:
+    """Feed the prefix of a resumed .part to the hasher and verifier in one read."""
+    with open(windows_longpath(path), "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            if hasher is not None:
+                hasher.update(chunk)
+            if verifier is not None:
+                verifier.feed(chunk)
+
+
+def _finish(tmp: Path, dest: Path, hasher=None) -> None:
+    """Move a complete .part into place, through the content store when one is enabled."""
+    if STORE is None:
+        os.replace(windows_longpath(tmp), windows_longpath(dest))
+        return
+    if hasher is None:
+        hasher = hash_file(windows_longpath(tmp))
+    STORE.materialize(tmp, dest, hasher.hexdigest())
+
+
+class IncompleteDownload(IOError):
+    """The connection ended before Content-Length bytes arrived; the .part is kept for resuming."""
+
+
+class CorruptDownload(IOError):
+    """All bytes arrived but the file is not a valid container; the .part is discarded."""
+
+
+def _discard(tmp: Path, meta_path: Path) -> None:
+    _drop_resume_state(meta_path)
+    try:
+        os.remove(windows_longpath(tmp))
+    except OSError:
+        pass
+
+
+def part_paths(dest: Path) -> Tuple[Path, Path]:
+    return dest.with_name(dest.name + ".part"), dest.with_name(dest.name + ".part.json")
+
+
+def _load_resume_state(meta_path: Path) -> Optional[dict]:
+    try:
+        with open(windows_longpath(meta_path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _drop_resume_state(meta_path: Path) -> None:
+    try:
+        os.remove(windows_longpath(meta_path))
+    except OSError:
+        pass
+
+
+def _validator(headers) -> Optional[str]:
+    """If-Range only accepts a strong ETag or a Last-Modified date."""
+    etag = headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return headers.get("Last-Modified")
+
+
+def _content_range(value: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    m = re.match(r"bytes (\d+)-\d+/(\d+|\*)", value or "")
+    if not m:
+        return None, None
+    return int(m.group(1)), (int(m.group(2)) if m.group(2) != "*" else None)
+
+
+def stream_to_file(url: str, dest_path, session: Optional[requests.Session] = None, headers: Optional[dict] = None,
+                   timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), chunk_size: int = CHUNK_SIZE, cookies=None,
+                   priority: Optional[int] = None) -> int:
+    """
+    Download `url` into `dest_path` through `<dest>.part`, resuming an
+    earlier partial download when the server supports ranges. Returns the
+    number of bytes transferred by this call; raises on any failure.
+    """
+    session = session or SESSION
+    dest = Path(dest_path)
+    tmp, meta_path = part_paths(dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    priority = priority_for(dest) if priority is None else priority
+
+    req_headers = dict(headers or {})
+    req_headers["Accept-Encoding"] = "identity"  # ranges are byte offsets into the raw body
+    offset = 0
+    state = _load_resume_state(meta_path)
+    if state and state.get("url") == url and state.get("validator") and os.path.exists(windows_longpath(tmp)):
+        offset = os.path.getsize(windows_longpath(tmp))
+        if offset:
+            req_headers["Range"] = f"bytes={offset}-"
+            req_headers["If-Range"] = state["validator"]
+
+    with session.get(url, headers=req_headers, cookies=cookies, stream=True, timeout=timeout,
+                     allow_redirects=True) as r:
+        if offset and r.status_code == 416 and state.get("length") == offset:
+            problem = verify_file(windows_longpath(tmp), name=dest.name)
+            if problem:
+                _discard(tmp, meta_path)
+                raise CorruptDownload(problem)
+            _finish(tmp, dest)
+            _drop_resume_state(meta_path)
+            return 0
+
+        start, total = _content_range(r.headers.get("Content-Range"))
+        if offset and r.status_code == 206 and start == offset:
+            mode = "ab"
+            length = total
+            print(f"↪️ Resuming {dest.name} at {offset / (1024 * 1024):.1f} MB")
+            DOWNLOAD_STATS.add(resumed=1, resumed_bytes=offset)
+        elif offset and r.status_code in (206, 416):
+            # Range answered but not for our offset: throw the partial away, next attempt starts fresh
+            _drop_resume_state(meta_path)
+            os.remove(windows_longpath(tmp))
+            raise IncompleteDownload(f"server did not resume {url} at byte {offset}")
+        else:
+            if r.status_code != 200:
+                _drop_resume_state(meta_path)
+                r.raise_for_status()
+                raise requests.HTTPError(f"Unexpected status {r.status_code}", response=r)
+            mode = "wb"
+            offset = 0
+            try:
+                length = int(r.headers["Content-Length"])
+            except (KeyError, ValueError):
+                length = None
+            validator = _validator(r.headers)
+            if validator and length and r.headers.get("Accept-Ranges", "").lower() != "none":
+                with open(windows_longpath(meta_path), "w", encoding="utf-8") as f:
+                    json.dump({"url": url, "validator": validator, "length": length}, f)
+            else:
+                _drop_resume_state(meta_path)
+
+        hasher = new_hasher() if STORE is not None else None
+        verifier = verifier_for(dest)
+        if mode == "ab" and (hasher is not None or verifier is not None):
+            _replay(tmp, hasher, verifier)
+        written = 0
+        with open(windows_longpath(tmp), mode, buffering=WRITE_BUFFER) as f:
+            for chunk in r.iter_content(chunk_size=chunk_size):
+                if chunk:
+                    f.write(chunk)
+                    if hasher is not None:
+                        hasher.update(chunk)
+                    if verifier is not None:
+                        verifier.feed(chunk)
+                    written += len(chunk)
+                    SCHEDULER.consume(len(chunk), priority)
+
+    if length is not None and offset + written != length:
+        raise IncompleteDownload(f"got {offset + written} of {length} bytes for {url}")
+    problem = verifier.finish() if verifier is not None else None
+    if problem:
+        _discard(tmp, meta_path)
+        raise CorruptDownload(problem)
+    if verifier is not None and verifier.container != "mp4":
+        # Not ISO-BMFF (WebM, HLS playlist, HTML page...): kept as served, not re-downloaded
+        print(f"⚠️ {dest.name} is {verifier.container} content, not MP4; kept unchecked")
+    _finish(tmp, dest, hasher)
+    _drop_resume_state(meta_path)
+    return written
+
+
+def _probe_range(url: str, session: requests.Session, headers: dict, cookies, timeout) -> Tuple[Optional[int], Optional[str]]:
+    """Ask for the first byte only; a 206 tells us the total size, range support and validator in one request."""
+    probe = dict(headers, Range="bytes=0-0")
+    with session.get(url, headers=probe, cookies=cookies, stream=True, timeout=timeout, allow_redirects=True) as r:
+        if r.status_code != 206:
+            return None, None
+        _, total = _content_range(r.headers.get("Content-Range"))
+        return total, _validator(r.headers)
+
+
+def _split(total: int, parts: int) -> List[Tuple[int, int]]:
+    size = -(-total // parts)
+    return [(start, min(start + size, total) - 1) for start in range(0, total, size)]
+
+
+def _fetch_segment(url: str, tmp: Path, start: int, end: int, session: requests.Session, headers: dict,
+                   validator: Optional[str], cookies, timeout, chunk_size: int, priority: int) -> int:
+    pos = start
+    for attempt in range(1, SEGMENT_RETRIES + 1):
+        seg_headers = dict(headers, Range=f"bytes={pos}-{end}")
+        if validator:
+            seg_headers["If-Range"] = validator
+        try:
+            with session.get(url, headers=seg_headers, cookies=cookies, stream=True, timeout=timeout,
+                             allow_redirects=True) as r:
+                got_start, _ = _content_range(r.headers.get("Content-Range"))
+                if r.status_code != 206 or got_start != pos:
+                    raise IncompleteDownload(f"segment {start}-{end} of {url} was not served as a range")
+                with open(windows_longpath(tmp), "r+b") as f:
+                    f.seek(pos)
+                    for chunk in r.iter_content(chunk_size=chunk_size):
+                        if chunk:
+                            chunk = chunk[:end + 1 - pos]
+                            f.write(chunk)
+                            pos += len(chunk)
+                            SCHEDULER.consume(len(chunk), priority)
+            if pos > end:
+                return end + 1 - start
+            raise IncompleteDownload(f"segment {start}-{end} stopped at byte {pos}")
+        except IncompleteDownload:
+            if attempt == SEGMENT_RETRIES:
+                raise
+        except requests.RequestException:
+            if attempt == SEGMENT_RETRIES:
+                raise
+        time.sleep(1.5 * attempt)
+    return pos - start
+
+
+def segmented_download(url: str, dest_path, session: Optional[requests.Session] = None,
+                       headers: Optional[dict] = None, cookies=None, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+                       segments: int = SEGMENTS, min_size: int = SEGMENT_THRESHOLD,
+                       chunk_size: int = CHUNK_SIZE, priority: int = VIDEO) -> Optional[int]:
+    """
+    Download `url` as `segments` parallel ranged requests into a preallocated
+    `<dest>.part`. Returns the byte count, or None when the file is too small,
+    its size is unknown or the server ignores ranges (caller streams instead).
+    """
+    session = session or SESSION
+    dest = Path(dest_path)
+    tmp, meta_path = part_paths(dest)
+    if os.path.exists(windows_longpath(meta_path)):
+        return None  # a resumable single-stream .part is already on disk
+
+    req_headers = dict(headers or {})
+    req_headers["Accept-Encoding"] = "identity"
+    total, validator = _probe_range(url, session, req_headers, cookies, timeout)
+    if not total or total < min_size:
+        return None
+
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    with open(windows_longpath(tmp), "wb") as f:
+        f.truncate(total)  # preallocate so every segment can seek to its offset
+
+    ranges = _split(total, segments)
+    print(f"⇶ {dest.name}: {total / (1024 * 1024):.1f} MB in {len(ranges)} segments")
+    try:
+        with ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+            futures = [
+                pool.submit(_fetch_segment, url, tmp, start, end, session, req_headers, validator,
+                            cookies, timeout, chunk_size, priority)
+                for start, end in ranges
+            ]
+            written = sum(f.result() for f in futures)
+    except Exception:
+        # A half-filled preallocated file cannot be resumed as a single stream
+        try:
+            os.remove(windows_longpath(tmp))
+        except OSError:
+            pass
+        raise
+    # Segments arrive out of order, so the structure check and the hash are done once here
+    problem = verify_file(windows_longpath(tmp), name=dest.name)
+    if problem:
+        _discard(tmp, meta_path)
+        raise CorruptDownload(problem)
+    _finish(tmp, dest)
+    return written
+
+
+def download_large_file(url: str, dest_path, session: Optional[requests.Session] = None,
+                        headers: Optional[dict] = None, cookies=None, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+                        chunk_size: int = CHUNK_SIZE, priority: int = VIDEO) -> int:
+    """
+    Segmented download when the server allows it, else a single (resumable)
+    stream. A file that arrives corrupt is fetched again from zero.
+    """
+    problem = None
+    for attempt in range(REPAIR_RETRIES + 1):
+        try:
+            written = segmented_download(url, dest_path, session=session, headers=headers, cookies=cookies,
+                                         timeout=timeout, chunk_size=chunk_size, priority=priority)
+            if written is None:
+                written = stream_to_file(url, dest_path, session=session, headers=headers, timeout=timeout,
+                                         chunk_size=chunk_size, cookies=cookies, priority=priority)
+        except CorruptDownload as e:
+            print(f"🩹 {Path(dest_path).name} is corrupt ({e}); downloading again")
+            problem = str(e)
+            if attempt == REPAIR_RETRIES:
+                raise
+            continue
+        if problem:
+            DOWNLOAD_STATS.add_repaired(dest_path, problem)
+        return written
+
+
+def download_file(url: str, dest_path, headers: Optional[dict] = None, session: Optional[requests.Session] = None,
+                  skip_existing: bool = True, retries: int = 3, quiet: bool = False,
+                  priority: Optional[int] = None) -> bool:
+    """
+    Stream `url` to `dest_path` via `<dest>.part` + atomic rename, resuming
+    a previous partial download when possible.
+    Returns True when the file is on disk (downloaded or already present).
+    """
+    if not url:
+        return False
+    dest = Path(dest_path)
+    problem = None
+    if skip_existing and dest.exists() and dest.stat().st_size > 0:
+        problem = verify_file(windows_longpath(dest), name=dest.name)
+        if not problem:
+            DOWNLOAD_STATS.add(skipped=1)
+            if URL_INDEX is not None and URL_INDEX.lookup(url) is None:
+                URL_INDEX.record(url, dest)  # files from before the index existed become link sources
+            return True
+        print(f"🩹 {dest.name} on disk is corrupt ({problem}); downloading again")
+    elif URL_INDEX is not None and URL_INDEX.materialize(url, dest):
+        if not quiet:
+            print(f"🔗 Linked (already downloaded): {dest}")
+        return True
+
+    for attempt in range(1, retries + 1):
+        try:
+            written = stream_to_file(url, dest, session=session, headers=headers, priority=priority)
+            DOWNLOAD_STATS.add(files=1, nbytes=written)
+            if problem:
+                DOWNLOAD_STATS.add_repaired(dest, problem)
+            if URL_INDEX is not None:
+                URL_INDEX.record(url, dest)
+            if not quiet:
+                print(f"📥 Saved: {dest}")
+            return True
+        except CorruptDownload as e:
+            problem = str(e)
+            if not quiet:
+                print(f"🩹 Attempt {attempt}/{retries}: {dest.name} is corrupt ({e}); downloading again")
+        except requests.HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
+            if status is not None and status < 500:
+                if not quiet:
+                    print(f"⚠️ Failed download ({status}): {url}")
+                DOWNLOAD_STATS.add(failed=1)
+                return False
+            if not quiet:
+                print(f"⚠️ Attempt {attempt}/{retries} failed for {url}: {e}")
+        except Exception as e:
+            if not quiet:
+                print(f"⚠️ Attempt {attempt}/{retries} failed for {url}: {e}")
+        if attempt < retries:
+            time.sleep(1.5 * attempt)
+
+    tmp, meta_path = part_paths(dest)
+    if not os.path.exists(windows_longpath(meta_path)):
+        try:
+            os.remove(windows_longpath(tmp))  # nothing to resume from
+        except OSError:
+            pass
+    DOWNLOAD_STATS.add(failed=1)
+    if not quiet:
+        print(f"❌ Failed to download {url}")
+    return False
@@ -0,0 +1,125 @@
+"""
+Content-addressed media store.
+
+The same video or poster is embedded by many campaigns. Instead of writing
+one copy per campaign folder and de-duplicating afterwards (the job of
+project8/check-video-duplicates.py, which re-reads every file), the
+downloader hashes bytes as they stream in and hands the finished `.part` to
+the store. The store keeps each distinct content once, under its SHA-256,
+and the campaign file becomes a hardlink to it: a duplicate costs no extra
+disk and never needs a second read.
+
+    from media_downloader import use_content_store
+    use_content_store(OUTPUT_ROOT.parent / ".media_store")   # same volume as the campaign folders
+
+Hardlinks need the store and the campaign folders on the same volume; where
+linking fails the file is simply moved into place as before.
+
+    python media_store.py .media_store      # unique blobs, links, space saved
+"""
+import hashlib
+import os
+import sys
+import threading
+from pathlib import Path
+
+MEDIA_STORE_DIR = ".media_store"
+HASH_CHUNK = 1024 * 1024
+
+
+def new_hasher():
+    return hashlib.sha256()
+
+
+def hash_file(path: str, hasher=None):
+    """Feed an existing file (e.g. the prefix of a resumed .part) into a hasher."""
+    hasher = hasher or new_hasher()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            hasher.update(chunk)
+    return hasher
+
+
+def link_over(src: str, dest: str) -> None:
+    """Hardlink src to dest, replacing dest atomically."""
+    tmp = dest + ".link"
+    try:
+        os.remove(tmp)
+    except OSError:
+        pass
+    os.link(src, tmp)
+    os.replace(tmp, dest)
+
+
+class ContentStore:
+    def __init__(self, root=MEDIA_STORE_DIR, longpath=str):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.longpath = longpath  # media_downloader passes windows_longpath
+        self.stored = 0
+        self.deduped = 0
+        self.bytes_saved = 0
+        self.unlinked = 0
+        self._lock = threading.Lock()
+
+    def blob_path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def materialize(self, tmp: Path, dest: Path, digest: str) -> bool:
+        """
+        Put the finished download `tmp` at `dest`, sharing storage with any
+        identical content already in the store. Returns True for a duplicate.
+        """
+        blob = self.blob_path(digest)
+        blob_s, tmp_s, dest_s = self.longpath(blob), self.longpath(tmp), self.longpath(dest)
+        size = os.path.getsize(tmp_s)
+        with self._lock:
+            duplicate = os.path.exists(blob_s)
+            if not duplicate:
+                blob.parent.mkdir(parents=True, exist_ok=True)
+                try:
+                    os.link(tmp_s, blob_s)
+                except OSError:
+                    # Different volume or no hardlink support: no dedup for this file
+                    os.replace(tmp_s, dest_s)
+                    self.unlinked += 1
+                    return False
+        if not duplicate:
+            os.replace(tmp_s, dest_s)  # dest and blob are now the same inode
+            with self._lock:
+                self.stored += 1
+            return False
+        try:
+            link_over(blob_s, dest_s)
+        except OSError:
+            os.replace(tmp_s, dest_s)
+            with self._lock:
+                self.unlinked += 1
+            return False
+        os.remove(tmp_s)
+        with self._lock:
+            self.deduped += 1
+            self.bytes_saved += size
+        return True
+
+    def report(self) -> None:
+        print(f"🧬 Content store: {self.stored} new, {self.deduped} duplicates linked "
+              f"({self.bytes_saved / (1024 * 1024):.1f} MB saved)"
+              + (f", {self.unlinked} could not be linked" if self.unlinked else ""))
+
+
+def summarize(root) -> None:
+    """Walk the store once (metadata only, no file reads) and print how much space sharing saves."""
+    blobs = links = saved = 0
+    for blob in Path(root).glob("??/*"):
+        st = blob.stat()
+        extra = st.st_nlink - 2  # one for the store, one for the first campaign file
+        blobs += 1
+        if extra > 0:
+            links += extra
+            saved += extra * st.st_size
+    print(f"🧬 {blobs} unique files, {links} duplicate links, {saved / (1024 ** 3):.2f} GB saved")
+
+
+if __name__ == "__main__":
+    summarize(sys.argv[1] if len(sys.argv) > 1 else MEDIA_STORE_DIR)
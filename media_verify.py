@@ -0,0 +1,147 @@
+"""
+Structural checks for downloaded media.
+
+A 200 with the right number of bytes can still be a broken file (a CDN
+error page saved as .mp4, a file cut short before the server knew its
+length). For MP4/MOV the top-level boxes ("atoms") must tile the file
+exactly and include `moov`, without which no player can open it.
+`Mp4Verifier` checks that while the bytes stream in, so no second read is
+needed; `verify_file` does the same for a file already on disk by seeking
+from box header to box header (a few bytes per box).
+
+    v = verifier_for(dest)             # None for formats we do not check
+    for chunk in ...: v.feed(chunk)
+    problem = v.finish()               # None when the file is sound
+
+Only real ISO-BMFF content is judged. The scrapers name every video `.mp4`,
+so a WebM, an HLS playlist or an HTML page under that name is not "corrupt":
+the verifier sniffs the first bytes, reports what they are in `container`,
+and passes the file through unchecked.
+"""
+import os
+import struct
+from typing import Optional
+
+MP4_EXTS = (".mp4", ".m4v", ".mov")
+# Box types that may legally appear at the top level of an ISO-BMFF file
+TOP_LEVEL_BOXES = {
+    b"ftyp", b"moov", b"mdat", b"free", b"skip", b"wide", b"uuid", b"pdin", b"moof",
+    b"mfra", b"meta", b"styp", b"sidx", b"ssix", b"prft", b"emsg", b"pnot", b"junk", b"PICT",
+}
+# An ISO-BMFF file starts with one of these
+FIRST_BOXES = {b"ftyp", b"styp", b"wide", b"free", b"skip", b"pnot"}
+
+
+def sniff_container(head: bytes) -> str:
+    """What the first bytes of a "video" really are: mp4, webm, hls, html or unknown."""
+    if head[4:8] in FIRST_BOXES:
+        return "mp4"
+    if head.startswith(b"\x1a\x45\xdf\xa3"):
+        return "webm"
+    text = head.lstrip(b"\xef\xbb\xbf \t\r\n").lower()
+    if text.startswith(b"#extm3u"):
+        return "hls"
+    if text.startswith(b"<"):
+        return "html"
+    return "unknown"
+
+
+class Mp4Verifier:
+    def __init__(self):
+        self.pos = 0  # bytes seen so far
+        self.next_box = 0  # offset of the next top-level box header
+        self.header = b""  # partial header bytes waiting for the rest
+        self.boxes = []
+        self.to_eof = False  # a box with size 0 runs to the end of the file
+        self.head = b""  # first bytes, held back until the container is known
+        self.container: Optional[str] = None
+        self.error: Optional[str] = None
+
+    def feed(self, chunk: bytes) -> None:
+        if self.container is None:
+            self.head += chunk
+            if len(self.head) < 16:
+                return
+            chunk, self.head = self.head, b""
+            self.container = sniff_container(chunk)
+        if self.container != "mp4":
+            self.pos += len(chunk)
+            return
+        self._parse(chunk)
+
+    def _parse(self, chunk: bytes) -> None:
+        if self.error or self.to_eof:
+            self.pos += len(chunk)
+            return
+        start = self.pos
+        self.pos += len(chunk)
+        while not self.error and not self.to_eof and self.next_box < self.pos:
+            # Gather the 8 (or 16 for 64-bit sizes) header bytes, which may straddle chunks
+            offset = max(self.next_box - start, 0)
+            self.header += chunk[offset:offset + 16 - len(self.header)]
+            if len(self.header) < 8:
+                return
+            size, box = struct.unpack(">I4s", self.header[:8])
+            header_len = 8
+            if size == 1:
+                if len(self.header) < 16:
+                    return
+                size = struct.unpack(">Q", self.header[8:16])[0]
+                header_len = 16
+            self.header = b""
+            if box not in TOP_LEVEL_BOXES:
+                self.error = f"unexpected top-level box {box!r} at byte {self.next_box}"
+                return
+            self.boxes.append(box)
+            if size == 0:
+                self.to_eof = True
+                return
+            if size < header_len:
+                self.error = f"invalid size {size} for box {box!r}"
+                return
+            self.next_box += size
+
+    def finish(self) -> Optional[str]:
+        """None when the file is a sound MP4, or is not MP4 content at all (see `container`)."""
+        if self.container is None:  # fewer than 16 bytes arrived
+            chunk, self.head = self.head, b""
+            self.container = sniff_container(chunk)
+            if self.container == "mp4":
+                self._parse(chunk)
+        if self.container != "mp4":
+            return None
+        if self.error:
+            return self.error
+        if not self.to_eof and self.next_box != self.pos:
+            return f"truncated: last box ends at byte {self.next_box}, file has {self.pos}"
+        if b"moov" not in self.boxes and b"moof" not in self.boxes:
+            return "no moov atom"
+        return None
+
+
+def verifier_for(path) -> Optional[Mp4Verifier]:
+    return Mp4Verifier() if str(path).lower().endswith(MP4_EXTS) else None
+
+
+def verify_file(path, name=None) -> Optional[str]:
+    """
+    Check a file already on disk; None when sound or not a format we verify.
+    `name` picks the format when `path` is a temporary name such as `x.mp4.part`.
+    """
+    v = verifier_for(name or path)
+    if v is None:
+        return None
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        v.container = sniff_container(f.read(16))
+        if v.container != "mp4":
+            return None
+        while not v.error and not v.to_eof and v.next_box < size:
+            at = v.next_box
+            f.seek(at)
+            v.pos, v.header = at, b""
+            v.feed(f.read(16))
+            if v.next_box == at and not (v.error or v.to_eof):
+                return f"truncated box header at byte {at}"
+        v.pos = size
+    return v.finish()
@@ -0,0 +1,166 @@
+"""
+Network-capture extraction for client-rendered (SPA) pages.
+
+Pages like the leclubdesda palmares or the oneclub gallery are rendered from
+XHR/fetch JSON. Rather than waiting for the DOM to render and parsing it
+with BeautifulSoup, record the page's JSON responses through Chrome's
+DevTools performance log and read the data straight from the payloads.
+
+The driver must be started with performance logging enabled:
+
+    options = uc.ChromeOptions()
+    enable_performance_logging(options)
+    driver = uc.Chrome(options=options)
+
+    driver.get(url)
+    payloads = capture_json_responses(driver)   # [(response_url, parsed_json), ...]
+"""
+import json
+import re
+import time
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+CAPTURE_TIMEOUT = 8.0  # seconds to wait for the first JSON response
+CAPTURE_SETTLE = 0.6  # stop once no new JSON response arrived for this long
+JSON_RESOURCE_TYPES = ("XHR", "Fetch")
+
+URL_RE = re.compile(r"^https?://", re.I)
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".webp", ".avif", ".gif")
+VIDEO_EXTS = (".mp4", ".webm", ".mov", ".m4v")
+VIDEO_HOSTS = ("vimeo.com", "youtube.com", "youtu.be")
+
+
+def enable_performance_logging(options) -> None:
+    """Ask Chrome to expose network events through driver.get_log('performance')."""
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+
+def drain_performance_log(driver) -> None:
+    """Throw away events from previous pages so they are not matched to the next one."""
+    try:
+        driver.get_log("performance")
+    except Exception:
+        pass
+
+
+def _network_events(driver) -> Iterator[dict]:
+    for entry in driver.get_log("performance"):
+        try:
+            message = json.loads(entry["message"])["message"]
+        except (KeyError, ValueError):
+            continue
+        if message.get("method", "").startswith("Network."):
+            yield message
+
+
+def capture_json_responses(driver, url_contains: Optional[str] = None, timeout: float = CAPTURE_TIMEOUT,
+                           settle: float = CAPTURE_SETTLE, request_grace: Optional[float] = None) -> List[Tuple[str, Any]]:
+    """
+    Collect the JSON bodies of XHR/fetch responses the current page made.
+
+    Waits up to `timeout` for the first matching response and returns once no
+    new one has finished for `settle` seconds. With `request_grace`, gives up
+    after that many seconds if no matching XHR/fetch request was even sent,
+    instead of waiting out `timeout` on pages without one. Responses whose
+    body cannot be read or parsed are skipped. Never raises.
+    """
+    pending = {}  # requestId -> response url
+    finished = set()
+    requested = False  # a matching XHR/fetch request was seen
+    results: List[Tuple[str, Any]] = []
+    start = time.monotonic()
+    last_hit = None
+
+    while True:
+        try:
+            events = list(_network_events(driver))
+        except Exception as e:
+            print(f"[WARN] Performance log unavailable: {e}")
+            return results
+
+        for ev in events:
+            params = ev.get("params", {})
+            method = ev["method"]
+            if method == "Network.requestWillBeSent":
+                if params.get("type") in JSON_RESOURCE_TYPES and (
+                        not url_contains or url_contains in params.get("request", {}).get("url", "")):
+                    requested = True
+            elif method == "Network.responseReceived":
+                response = params.get("response", {})
+                if params.get("type") not in JSON_RESOURCE_TYPES:
+                    continue
+                if "json" not in response.get("mimeType", "").lower():
+                    continue
+                if url_contains and url_contains not in response.get("url", ""):
+                    continue
+                pending[params["requestId"]] = response.get("url", "")
+            elif method == "Network.loadingFinished":
+                finished.add(params.get("requestId"))
+
+        for request_id in [r for r in pending if r in finished]:
+            response_url = pending.pop(request_id)
+            try:
+                body = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+                results.append((response_url, json.loads(body.get("body", ""))))
+                last_hit = time.monotonic()
+            except Exception:
+                continue
+
+        now = time.monotonic()
+        if last_hit is not None and not pending and now - last_hit >= settle:
+            break
+        if last_hit is None and now - start >= timeout:
+            break
+        if request_grace is not None and not requested and not pending and now - start >= request_grace:
+            break
+        if now - start >= timeout + settle * 4:
+            break
+        time.sleep(0.1)
+
+    return results
+
+
+def walk(obj: Any, path: Tuple = ()) -> Iterator[Tuple[Tuple, Any]]:
+    """Yield (key path, value) for every scalar in a JSON document."""
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            yield from walk(v, path + (k,))
+    elif isinstance(obj, list):
+        for i, v in enumerate(obj):
+            yield from walk(v, path + (i,))
+    else:
+        yield path, obj
+
+
+def first_value(obj: Any, keys: Iterable[str]) -> Optional[Any]:
+    """Breadth-first search for the first non-empty value stored under any of `keys`."""
+    keys = tuple(k.lower() for k in keys)
+    queue = [obj]
+    while queue:
+        node = queue.pop(0)
+        if isinstance(node, dict):
+            for k, v in node.items():
+                if str(k).lower() in keys and v not in (None, "", [], {}):
+                    return v
+            queue.extend(node.values())
+        elif isinstance(node, list):
+            queue.extend(node)
+    return None
+
+
+def media_urls(payloads: Iterable[Tuple[str, Any]]) -> Tuple[List[str], List[str]]:
+    """Return (image_urls, video_urls) found anywhere in the payloads, in order, de-duplicated."""
+    images, videos = [], []
+    for _, payload in payloads:
+        for _, value in walk(payload):
+            if not isinstance(value, str) or not URL_RE.match(value):
+                continue
+            lower = value.lower()
+            path = lower.split("?")[0]
+            if any(h in lower for h in VIDEO_HOSTS) or path.endswith(VIDEO_EXTS):
+                if value not in videos:
+                    videos.append(value)
+            elif path.endswith(IMAGE_EXTS) or "fm=jpg" in lower:
+                if value not in images:
+                    images.append(value)
+    return images, videos
@@ -0,0 +1,119 @@
+"""
+Readiness waits shared by the Selenium scrapers.
+
+Instead of sleeping a fixed amount after every navigation or click, wait for
+the concrete selector the page needs and give up after a short ceiling.
+Every wait is recorded next to the fixed delay it replaced so a run can
+print how much wall time was saved.
+
+    from page_waits import wait_for_css, WAIT_STATS
+
+    driver.get(url)
+    wait_for_css(driver, "div.item", replaces=2)
+    ...
+    WAIT_STATS.report()
+"""
+import time
+from typing import Callable, Optional
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+DEFAULT_CEILING = 5.0  # seconds
+POLL_INTERVAL = 0.1
+
+
+class WaitStats:
+    def __init__(self):
+        self.waits = 0
+        self.timeouts = 0
+        self.waited = 0.0
+        self.replaced = 0.0
+
+    def record(self, elapsed: float, replaces: float, ok: bool) -> None:
+        self.waits += 1
+        self.waited += elapsed
+        self.replaced += replaces
+        if not ok:
+            self.timeouts += 1
+
+    @property
+    def saved(self) -> float:
+        return self.replaced - self.waited
+
+    def report(self) -> None:
+        print(
+            f"⏱️ Waits: {self.waits} ({self.timeouts} hit the ceiling) | "
+            f"waited {self.waited:.1f}s vs {self.replaced:.1f}s of fixed sleeps | "
+            f"saved {self.saved:.1f}s"
+        )
+
+
+WAIT_STATS = WaitStats()
+
+
+def wait_until(driver, condition: Callable, timeout: float = DEFAULT_CEILING, replaces: float = 0.0) -> bool:
+    """
+    Poll `condition(driver)` until it returns something truthy or `timeout`
+    elapses. `replaces` is the fixed sleep this wait stands in for and is only
+    used for the saved-time report. Returns False on timeout, never raises.
+    """
+    start = time.monotonic()
+    ok = True
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=POLL_INTERVAL).until(condition)
+    except (TimeoutException, WebDriverException):
+        ok = False
+    WAIT_STATS.record(time.monotonic() - start, replaces, ok)
+    return ok
+
+
+def wait_for_css(driver, selector: str, timeout: float = DEFAULT_CEILING, replaces: float = 0.0,
+                 visible: bool = False) -> bool:
+    """Wait for at least one element matching `selector` (optionally displayed)."""
+    def _present(d):
+        elements = d.find_elements(By.CSS_SELECTOR, selector)
+        if not visible:
+            return bool(elements)
+        return any(e.is_displayed() for e in elements)
+    return wait_until(driver, _present, timeout, replaces)
+
+
+def wait_for_attr(driver, selector: str, attr: str, timeout: float = DEFAULT_CEILING, replaces: float = 0.0,
+                  not_value: Optional[str] = None) -> Optional[str]:
+    """
+    Wait for the first element matching `selector` to carry a non-empty `attr`
+    (different from `not_value`, e.g. the src of the previous slide).
+    Returns the attribute value, or None on timeout.
+    """
+    found = {}
+
+    def _has_attr(d):
+        for e in d.find_elements(By.CSS_SELECTOR, selector):
+            value = e.get_attribute(attr)
+            if value and value != not_value:
+                found["value"] = value
+                return True
+        return False
+
+    wait_until(driver, _has_attr, timeout, replaces)
+    return found.get("value")
+
+
+def current_attr(driver, selector: str, attr: str) -> Optional[str]:
+    """`attr` of the first element matching `selector` right now; capture it before a click, pass as not_value."""
+    try:
+        elements = driver.find_elements(By.CSS_SELECTOR, selector)
+        return elements[0].get_attribute(attr) if elements else None
+    except WebDriverException:
+        return None
+
+
+def wait_for_document_ready(driver, timeout: float = DEFAULT_CEILING, replaces: float = 0.0) -> bool:
+    return wait_until(
+        driver,
+        lambda d: d.execute_script("return document.readyState") == "complete",
+        timeout,
+        replaces,
+    )
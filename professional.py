@@ -1,8 +1,6 @@
 import os
 import re
 import json
-import subprocess
-import requests
 import time
 from bs4 import BeautifulSoup
 from selenium import webdriver
@@ -15,10 +13,26 @@ from selenium.common.exceptions import TimeoutException, WebDriverException
 import urllib3
 import socket
 
-def safe_get(driver, url, retries=3, delay=3):
+from page_waits import wait_for_css, WAIT_STATS
+import media_downloader
+from bandwidth import SCHEDULER
+from ytdlp_engine import YtDlpEngine
+from vimeo_thumbs import VimeoThumbResolver
+
+# Videos download on long-lived YoutubeDL workers while the images are fetched
+YTDLP = YtDlpEngine(workers=2)
+# Vimeo oEmbed thumbnails resolve in the background, cached in vimeo_thumbs.json
+VIMEO_THUMBS = VimeoThumbResolver()
+# `*_thumb` files are metered as thumbnails, ahead of images and videos
+BANDWIDTH_CAP_MB = 25  # MB/s for all downloads together (pages > thumbnails > images > videos); None = unlimited
+SCHEDULER.configure(BANDWIDTH_CAP_MB)
+
+def safe_get(driver, url, retries=3, delay=3, blank_first=False):
     for attempt in range(retries):
         try:
             driver.set_page_load_timeout(60)
+            if blank_first:
+                driver.get("about:blank")
             driver.get(url)
             return True
         except (TimeoutException, WebDriverException, urllib3.exceptions.ReadTimeoutError, socket.timeout) as e:
@@ -46,21 +60,31 @@ FAILED_URLS = []
 
 import undetected_chromedriver as uc
 
+from driver_recycler import RecyclingDriver
+
+# Restart Chrome every N page loads or when it grows past this much memory (MB)
+RECYCLE_EVERY_PAGES = 300
+RECYCLE_MAX_RSS_MB = 2500
+
 # ====== SELENIUM SETUP (Undetected) ======
-options = uc.ChromeOptions()
-options.add_argument("--no-sandbox")
-options.add_argument("--disable-dev-shm-usage")
-options.add_argument("--disable-gpu")
-options.add_argument("--disable-software-rasterizer")
-options.add_argument("--disable-webgl")
-options.add_argument("--window-size=1920,1080")
-options.add_argument("--start-maximized")
-options.add_argument("--user-agent=Mozilla/5.0")
+def make_driver():
+    # uc refuses to reuse a ChromeOptions object, so build a fresh one per launch
+    options = uc.ChromeOptions()
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-software-rasterizer")
+    options.add_argument("--disable-webgl")
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--start-maximized")
+    options.add_argument("--user-agent=Mozilla/5.0")
+
+    # Optional: headless mode (only enable if stable)
+    # options.add_argument("--headless=new")
 
-# Optional: headless mode (only enable if stable)
-# options.add_argument("--headless=new")
+    return uc.Chrome(options=options, use_subprocess=True)
 
-driver = uc.Chrome(options=options, use_subprocess=True)
+driver = RecyclingDriver(make_driver, every=RECYCLE_EVERY_PAGES, max_rss_mb=RECYCLE_MAX_RSS_MB)
 
 # ====== STEP 1: GENERATE PAGE URLS ======
 BASE_URL = "https://www.adsoftheworld.com/professional?page="
@@ -76,18 +100,16 @@ article_urls = set()
 for page_url in ALL_PAGES:
     print(f"🔍 Scraping: {page_url}")
 
-    # Reset browser state
-    driver.get("about:blank")
-    time.sleep(0.5)
-
-    # Robust load attempt with retries
-    if not safe_get(driver, page_url):
+    # Robust load attempt with retries; blank first so the card wait below
+    # cannot match the previous page
+    if not safe_get(driver, page_url, blank_first=True):
         FAILED_URLS.append(page_url)
         continue
 
-    # Scroll down to trigger lazy-loaded cards
+    # Scroll down to trigger lazy-loaded cards, then wait for them
+    # (replaces the old 0.5s + 1s sleeps)
     driver.execute_script("window.scrollTo(0, document.body.scrollHeight / 2);")
-    time.sleep(1)
+    wait_for_css(driver, "div[id^='campaign_card_'] a[href^='/campaigns/']", replaces=1.5)
 
     soup = BeautifulSoup(driver.page_source, 'html.parser')
 
@@ -108,36 +130,21 @@ print(f"✅ Total unique campaigns found: {len(article_urls)} and saved to profe
 
 # ====== UTILITY: VIDEO & FILE DOWNLOAD ======
 def download_file(url, dest_path, retries=3):
-    for attempt in range(retries):
-        try:
-            r = requests.get(url, stream=True, timeout=15)
-            if r.status_code == 200:
-                with open(dest_path, 'wb') as f:
-                    for chunk in r.iter_content(1024):
-                        f.write(chunk)
-                return
-        except Exception as e:
-            print(f"Retry {attempt+1}/{retries} failed for {url}: {e}")
-            time.sleep(2)
-    print(f"❌ Failed to download {url}")
+    media_downloader.download_file(url, dest_path, skip_existing=False, retries=retries)
 
 with open("professional_campaign_urls.txt", "r", encoding="utf-8") as f:
     article_urls = [line.strip() for line in f.readlines() if line.strip()]
 
 # ====== STEP 3: LOOP THROUGH EACH ARTICLE ======
 for url in article_urls:
-    # driver.get(url)
-    # time.sleep(1)
-    driver.get("about:blank")
-    time.sleep(0.5)
-
-    if not safe_get(driver, url):
+    # Blank first: the title wait below must only see the new article's h1
+    if not safe_get(driver, url, blank_first=True):
         FAILED_URLS.append(url)
         continue
 
-    # Trigger lazy loading (important for full rendering)
+    # Trigger lazy loading (important for full rendering), then wait for the title
     driver.execute_script("window.scrollTo(0, document.body.scrollHeight / 2);")
-    time.sleep(1)
+    wait_for_css(driver, "h1.text-2xl.karlasemibold", replaces=1.5)
     soup = BeautifulSoup(driver.page_source, 'html.parser')
 
     # Title
@@ -213,13 +220,14 @@ for url in article_urls:
         print(f"Category error: {e}")
 
     # Media (videos & images)
-    videos, image_urls = [], []
+    videos, image_urls, pending_thumbs = [], [], []
     try:
         iframe = soup.find('iframe')
         if iframe and 'player.vimeo.com/video/' in iframe['src']:
             vimeo_id = re.search(r'/video/(\d+)', iframe['src']).group(1)
-            thumb = requests.get(f'https://vimeo.com/api/oembed.json?url=https://vimeo.com/{vimeo_id}').json().get('thumbnail_url')
-            videos.append({"video_url": iframe['src'], "thumbnail": thumb})
+            video = {"video_url": iframe['src'], "thumbnail": None}
+            pending_thumbs.append((video, VIMEO_THUMBS.submit(vimeo_id)))
+            videos.append(video)
 
         for div in soup.find_all('div', class_='bg-white my-3'):
             if (video_tag := div.find('video', src=True, poster=True)):
@@ -252,29 +260,30 @@ for url in article_urls:
     os.makedirs(output_dir, exist_ok=True)
 
     # Save videos
+    video_jobs = []
     for i, vid in enumerate(videos, 1):
         v_url = vid.get("video_url")
         if v_url and not v_url.startswith("blob"):
             video_path = os.path.join(output_dir, f"{title}_{i}.mp4")
-            try:
-                subprocess.run([
-                    "yt-dlp", "--referer", "https://www.adsoftheworld.com",
-                    "-f", "bestvideo+bestaudio/best", "--merge-output-format", "mp4",
-                    "-o", video_path, v_url
-                ], check=True)
-            except subprocess.CalledProcessError:
-                print(f"yt-dlp failed: {v_url}")
-
-            thumb = vid.get("thumbnail")
-            if thumb:
-                ext = os.path.splitext(thumb.split("?")[0])[1] or ".jpg"
-                download_file(thumb, os.path.join(output_dir, f"{safe_title}_{i}_thumb{ext}"))
+            video_jobs.append(YTDLP.submit(v_url, video_path, referer="https://www.adsoftheworld.com"))
 
     # Save images
     for i, img_url in enumerate(image_urls):
         img_path = os.path.join(output_dir, f"{safe_title}_{i+1}.jpg")
         download_file(img_url, img_path)
 
+    # Save thumbnails (Vimeo lookups have been resolving meanwhile)
+    VIMEO_THUMBS.fill(pending_thumbs)
+    for i, vid in enumerate(videos, 1):
+        v_url = vid.get("video_url")
+        thumb = vid.get("thumbnail")
+        if v_url and not v_url.startswith("blob") and thumb:
+            ext = os.path.splitext(thumb.split("?")[0])[1] or ".jpg"
+            download_file(thumb, os.path.join(output_dir, f"{safe_title}_{i}_thumb{ext}"))
+
+    for job in video_jobs:
+        job.result()
+
     # Save metadata
     output_json = {
         "origin": {"name": "adsoftheworld.com", "url": url},
@@ -301,4 +310,12 @@ for url in article_urls:
 
     print(f"✅ Saved {safe_title} to {output_dir}")
 
-driver.quit()
\ No newline at end of file
+driver.quit()
+print(f"♻️ Chrome restarts: {driver.restarts}")
+WAIT_STATS.report()
+media_downloader.DOWNLOAD_STATS.report()
+YTDLP.close()
+YTDLP.report()
+VIMEO_THUMBS.close()
+VIMEO_THUMBS.report()
+SCHEDULER.report()
\ No newline at end of file
@@ -2,8 +2,10 @@ import os
 import re
 import json
 import time
-import requests
-import subprocess
+import media_downloader
+from bandwidth import SCHEDULER
+from ytdlp_engine import YtDlpEngine
+from vimeo_thumbs import VimeoThumbResolver
 from urllib.parse import urlparse, parse_qs
 from bs4 import BeautifulSoup
 from selenium import webdriver
@@ -12,6 +14,14 @@ from selenium.webdriver.common.by import By
 
 log_file = open("failed_links.txt", "a", encoding="utf-8")
 
+# Videos download on long-lived YoutubeDL workers while thumbnails are fetched
+YTDLP = YtDlpEngine(workers=2)
+# Vimeo oEmbed thumbnails resolve in the background, cached in vimeo_thumbs.json
+VIMEO_THUMBS = VimeoThumbResolver()
+# `*_thumb` files are metered as thumbnails, ahead of images and videos
+BANDWIDTH_CAP_MB = 25  # MB/s for all downloads together (pages > thumbnails > images > videos); None = unlimited
+SCHEDULER.configure(BANDWIDTH_CAP_MB)
+
 # ====== MAPPINGS ======
 award_map = {
     "9": "Gold", "13": "Silver", "10": "Bronze", "5": "Shortlist"
@@ -32,19 +42,8 @@ def slugify(text):
     return re.sub(r'[^a-zA-Z0-9_-]', '_', text.strip().lower())
 
 def download_file(url, dest_path, retries=3):
-    for attempt in range(retries):
-        try:
-            r = requests.get(url, stream=True, timeout=15)
-            if r.status_code == 200:
-                with open(dest_path, 'wb') as f:
-                    for chunk in r.iter_content(1024):
-                        f.write(chunk)
-                return
-        except Exception as e:
-            print(f"Retry {attempt+1}/{retries} failed for {url}: {e}")
-            time.sleep(2)
-    log_file.write(f"Failed to download {url} after {retries} attempts\n")
-    print(f"❌ Failed to download {url}")
+    if not media_downloader.download_file(url, dest_path, skip_existing=False, retries=retries):
+        log_file.write(f"Failed to download {url} after {retries} attempts\n")
 
 # ====== SELENIUM SETUP ======
 options = Options()
@@ -119,15 +118,14 @@ for year in years:
                             image_tags = image_container.find_all('img', class_='css-0')
                             image_urls = [img['src'] for img in image_tags if img.get('src')]
 
-                        videos = []
+                        videos, pending_thumbs = [], []
                         iframe = soup.find('iframe')
                         if iframe and 'player.vimeo.com/video/' in iframe['src']:
                             vimeo_id_match = re.search(r'/video/(\d+)', iframe['src'])
                             if vimeo_id_match:
-                                vid = vimeo_id_match.group(1)
-                                oembed = f'https://vimeo.com/api/oembed.json?url=https://vimeo.com/{vid}'
-                                thumb = requests.get(oembed).json().get('thumbnail_url', None)
-                                videos.append({"video_url": iframe['src'], "thumbnail": thumb})
+                                video = {"video_url": iframe['src'], "thumbnail": None}
+                                pending_thumbs.append((video, VIMEO_THUMBS.submit(vimeo_id_match.group(1))))
+                                videos.append(video)
 
                         folder = os.path.join("scrapedata", detected_year, category, slugify(title))
                         os.makedirs(folder, exist_ok=True)
@@ -141,35 +139,32 @@ for year in years:
                             "credits": credits, "image_urls": image_urls, "videos": videos,
                             "tags": None, "product": None
                         }
-                        with open(os.path.join(folder, f"{title}.json"), "w", encoding="utf-8-sig") as f:
-                            json.dump(metadata, f, indent=2, ensure_ascii=False)
-
                         for i, img_url in enumerate(image_urls, 1):
                             ext = os.path.splitext(img_url.split("?")[0])[1] or ".jpg"
                             download_file(img_url, os.path.join(folder, f"{title}_{i}{ext}"))
 
+                        # Vimeo thumbnails were resolving while the images downloaded
+                        VIMEO_THUMBS.fill(pending_thumbs)
+                        with open(os.path.join(folder, f"{title}.json"), "w", encoding="utf-8-sig") as f:
+                            json.dump(metadata, f, indent=2, ensure_ascii=False)
+
+                        video_jobs = []
                         for i, vid in enumerate(videos, 1):
                             v_url = vid.get("video_url")
                             if v_url and not v_url.startswith("blob"):
                                 out = os.path.join(folder, f"{title}_{i}.mp4")
-                                try:
-                                    subprocess.run([
-                                        "yt-dlp",
-                                        "--referer", "https://leclubdesda.org",
-                                        "-f", "bestvideo+bestaudio/best",
-                                        "--merge-output-format", "mp4",
-                                        "-o", out,
-                                        v_url
-                                    ], check=True)
-                                except subprocess.CalledProcessError as e:
-                                    print(f"yt-dlp failed for {v_url}: {e}")
-                                    log_file.write(f"Video Download Error: {v_url} | Reason: {e}\n")
+                                video_jobs.append(YTDLP.submit(v_url, out, referer="https://leclubdesda.org"))
 
                             thumb = vid.get("thumbnail")
                             if thumb:
                                 ext = os.path.splitext(thumb.split("?")[0])[1] or ".jpg"
                                 download_file(thumb, os.path.join(folder, f"{title}_{i}_thumb{ext}"))
 
+                        for job in video_jobs:
+                            res = job.result()
+                            if not res["ok"]:
+                                log_file.write(f"Video Download Error: {res['url']} | Reason: {res['error']}\n")
+
                     except Exception as e:
                         print(f"❌ Error on {link}: {e}")
                         log_file.write(f"Project Error: {link} | Reason: {e}\n")
@@ -177,3 +172,9 @@ for year in years:
 print("\n🎉 Finished scraping all data")
 log_file.close()
 driver.quit()
+media_downloader.DOWNLOAD_STATS.report()
+YTDLP.close()
+YTDLP.report()
+VIMEO_THUMBS.close()
+VIMEO_THUMBS.report()
+SCHEDULER.report()
@@ -1,8 +1,8 @@
-import os
 import re
 import json
 import time
-import subprocess
+import threading
+import queue
 import requests
 from pathlib import Path
 from urllib.parse import urlparse, parse_qs
@@ -13,20 +13,38 @@ from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import WebDriverException
 from lxml import html
-from requests.adapters import HTTPAdapter, Retry
+from requests.adapters import Retry
 import sys
 import platform
 
+from chrome_lean import enable_lean_mode
+from host_throttle import AdaptiveRateLimiter, ThrottledAdapter
+from http_cache import HttpCache, CachingAdapter
+import media_downloader
+from media_downloader import stream_to_file, download_large_file, DOWNLOAD_STATS, use_content_store
+from ytdlp_engine import YtDlpEngine
+from host_classifier import HostClassifier, classify_content_type
+from bandwidth import SCHEDULER, IMAGE
+
 # =========================
 # Config
 # =========================
 CAMPAIGN_LIST_FILE = "professional_urls_done.txt"  # one URL per line
 OUTPUT_ROOT = Path(r"adsoftheworld\professional")
 HEADLESS = True
+LEAN_MODE = True  # block images/media/fonts/analytics in Chrome; we only read the DOM
 REQUEST_TIMEOUT = 25
 PAGE_LOAD_RETRIES = 3
 SLEEP_BETWEEN_PAGES = 0.1  # seconds
+URL_SLICE = slice(1725, 3000)  # Limit for testing; slice(None) for the whole list
+POOL_WORKERS = 1  # >1 runs N Chrome drivers fed from a shared queue
+RESULT_QUEUE_SIZE = 64  # parsed campaigns waiting for the writer
+DOWNLOAD_WORKERS = 6  # media download threads; 0 downloads inline before moving to the next page
+DOWNLOAD_QUEUE_SIZE = 256  # pending media jobs; parsing blocks when this is full
+CONTENT_STORE = True  # hash while downloading; identical files across campaigns become hardlinks
+BANDWIDTH_CAP_MB = 25  # MB/s for all downloads together (pages > images > videos); None = unlimited
 YT_DLP_COOKIES = None  # e.g., "cookies.txt" if you need auth-only YouTube videos
+YT_DLP_WORKERS = 2  # yt-dlp downloads running at once across all download threads
 
 REQUEST_HEADERS = {
     "User-Agent": "Mozilla/5.0",
@@ -42,15 +60,26 @@ FILEBASE_MAX_LEN = 60
 # =========================
 # Requests session with retries
 # =========================
+# Per-host token buckets shared by every call through SESSION. 429/503 are
+# handled here (halve the host's rate, honour Retry-After, retry) instead of
+# by the static urllib3 backoff below.
+RATE_LIMITER = AdaptiveRateLimiter()
+# Pages and images are revalidated with If-None-Match / If-Modified-Since on
+# re-crawls; a 304 is answered from the on-disk cache.
+HTTP_CACHE = HttpCache()
+
+class SessionAdapter(CachingAdapter, ThrottledAdapter):
+    pass
+
 def make_session() -> requests.Session:
     s = requests.Session()
     retries = Retry(
         total=3,
         backoff_factor=0.8,
-        status_forcelist=(429, 500, 502, 503, 504),
+        status_forcelist=(500, 502, 504),
         allowed_methods=frozenset(["HEAD", "GET"])
     )
-    adapter = HTTPAdapter(max_retries=retries, pool_connections=16, pool_maxsize=32)
+    adapter = SessionAdapter(RATE_LIMITER, cache=HTTP_CACHE, max_retries=retries, pool_connections=16, pool_maxsize=32)
     s.mount("http://", adapter)
     s.mount("https://", adapter)
     s.headers.update(REQUEST_HEADERS)
@@ -58,6 +87,14 @@ def make_session() -> requests.Session:
 
 SESSION = make_session()
 
+# Learned host -> direct/ytdlp/not_video answers; skips the HEAD once a host is known
+HOST_CLASSES = HostClassifier()
+
+# One long-lived YoutubeDL per download thread instead of a yt-dlp process per video
+YTDLP = YtDlpEngine(workers=YT_DLP_WORKERS, cookies=YT_DLP_COOKIES)
+# download() runs on the calling pipeline thread, so the cap is applied here
+YT_DLP_SLOTS = threading.BoundedSemaphore(YT_DLP_WORKERS)
+
 # =========================
 # Helpers
 # =========================
@@ -107,14 +144,19 @@ def get_selenium_driver() -> webdriver.Chrome:
     options.add_argument("--start-maximized")
     options.add_argument("user-agent=Mozilla/5.0")
     try:
-        return webdriver.Chrome(options=options)
+        driver = webdriver.Chrome(options=options)
     except WebDriverException as e:
         raise RuntimeError(f"Failed to start Chrome driver: {e}")
+    if LEAN_MODE:
+        enable_lean_mode(driver)
+    return driver
 
 def robust_get(driver: webdriver.Chrome, url: str, retries: int = PAGE_LOAD_RETRIES) -> Optional[str]:
     for attempt in range(1, retries + 1):
         try:
-            driver.get(url)
+            # Images/videos drop to a share of the cap while Chrome loads the page
+            with SCHEDULER.page_load():
+                driver.get(url)
             return driver.page_source
         except Exception as e:
             print(f"[WARN] Load attempt {attempt}/{retries} failed for {url}: {e}")
@@ -198,20 +240,15 @@ def normalize_video_url(u: str) -> str:
         return u
 
 def download_with_requests(url: str, out_path: Path) -> bool:
+    # Resumes an interrupted .part with a Range request when the server allows it
     try:
-        resp = SESSION.get(url, timeout=REQUEST_TIMEOUT, stream=True)
-        resp.raise_for_status()
-        out_path_parent = out_path.parent
-        out_path_parent.mkdir(parents=True, exist_ok=True)
-        tmp_path = out_path.with_suffix(out_path.suffix + ".part")
-        with open(windows_longpath(tmp_path), "wb") as f:
-            for chunk in resp.iter_content(chunk_size=1024 * 512):
-                if chunk:
-                    f.write(chunk)
-        os.replace(windows_longpath(tmp_path), windows_longpath(out_path))
+        written = stream_to_file(url, out_path, session=SESSION, timeout=REQUEST_TIMEOUT, chunk_size=1024 * 512,
+                                 priority=IMAGE)
+        DOWNLOAD_STATS.add(files=1, nbytes=written)
         return True
     except Exception as e:
         print(f"[WARN] Failed to download {url}: {e}")
+        DOWNLOAD_STATS.add(failed=1)
         return False
 
 def download_video_yt_dlp(video_url: str, output_path: Path) -> bool:
@@ -220,19 +257,8 @@ def download_video_yt_dlp(video_url: str, output_path: Path) -> bool:
         if not url or url.strip() == "" or url.lower().endswith("/embed/"):
             print(f"[WARN] Skipping yt-dlp; invalid URL after normalize: {video_url}")
             return False
-        cmd = [
-            "yt-dlp",
-            "--referer", "https://www.adsoftheworld.com/",
-            "-f", "bestvideo+bestaudio/best",
-            "--merge-output-format", "mp4",
-            "-o", str(output_path),   # avoid \\?\ with external tools
-            "--",
-            url
-        ]
-        if YT_DLP_COOKIES and Path(YT_DLP_COOKIES).exists():
-            cmd.extend(["--cookies", YT_DLP_COOKIES])
-        subprocess.run(cmd, check=True)
-        return True
+        with YT_DLP_SLOTS:
+            return YTDLP.download(url, output_path, referer="https://www.adsoftheworld.com/")["ok"]
     except Exception as e:
         print(f"[WARN] yt-dlp failed for {video_url}: {e}")
         return False
@@ -244,10 +270,16 @@ def is_direct_video_url(url: str) -> bool:
             return False
         if any(lower.split("?")[0].endswith(ext) for ext in DIRECT_VIDEO_EXTS):
             return True
+        known = HOST_CLASSES.classify(url)
+        if known:
+            return known == "direct"
         try:
             h = SESSION.head(url, timeout=REQUEST_TIMEOUT, allow_redirects=True)
-            ct = h.headers.get("Content-Type", "").lower()
-            return ct.startswith("video/") or "octet-stream" in ct
+            if h.status_code >= 400:
+                return False  # says nothing about the host
+            cls = classify_content_type(h.headers.get("Content-Type", ""))
+            HOST_CLASSES.observe(url, cls)
+            return cls == "direct"
         except Exception:
             return False
     except Exception:
@@ -255,18 +287,14 @@ def is_direct_video_url(url: str) -> bool:
 
 def download_video_requests(video_url: str, output_path: Path) -> bool:
     try:
-        with SESSION.get(video_url, timeout=REQUEST_TIMEOUT, stream=True, allow_redirects=True) as r:
-            r.raise_for_status()
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            tmp_path = output_path.with_suffix(output_path.suffix + ".part")
-            with open(windows_longpath(tmp_path), "wb") as f:
-                for chunk in r.iter_content(chunk_size=1024 * 512):
-                    if chunk:
-                        f.write(chunk)
-            os.replace(windows_longpath(tmp_path), windows_longpath(output_path))
+        # Files over SEGMENT_THRESHOLD are fetched as parallel ranged segments
+        written = download_large_file(video_url, output_path, session=SESSION, timeout=REQUEST_TIMEOUT,
+                                      chunk_size=1024 * 512)
+        DOWNLOAD_STATS.add(files=1, nbytes=written)
         return True
     except Exception as e:
         print(f"[WARN] requests download failed for {video_url}: {e}")
+        DOWNLOAD_STATS.add(failed=1)
         return False
 
 def download_video_preferring_requests(video_url: str, output_path: Path) -> bool:
@@ -278,7 +306,11 @@ def download_video_preferring_requests(video_url: str, output_path: Path) -> boo
         ok = download_video_requests(video_url, output_path)
         if ok:
             return True
-        return download_video_yt_dlp(video_url, output_path)
+        ok = download_video_yt_dlp(video_url, output_path)
+        if ok:
+            # Classified direct but only yt-dlp worked: the host pattern goes back to being probed
+            HOST_CLASSES.observe(video_url, "ytdlp")
+        return ok
     return download_video_yt_dlp(video_url, output_path)
 
 # Skip logic
@@ -429,40 +461,41 @@ def parse_campaign(driver: webdriver.Chrome, url: str) -> Optional[Dict[str, Any
         "videos": videos
     }
 
-def process_and_save_campaign(result: Dict[str, Any]) -> None:
+def plan_campaign(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Turn a parsed campaign into its output folder, JSON path and the list of
+    media download jobs: (kind, url, path, fallback_path).
+    """
     title_slug = safe_slug(result.get("title_slug") or "untitled", SLUG_MAX_LEN)
-    data = result["data"]
-    images = result["images"]
-    videos = result["videos"]
-
     out_dir = OUTPUT_ROOT / title_slug
     out_dir.mkdir(parents=True, exist_ok=True)
 
     base = short_base(title_slug, FILEBASE_MAX_LEN)
 
-    # Videos (failures won't block JSON)
-    for i, v in enumerate(videos, start=1):
+    jobs = []
+    for i, v in enumerate(result["videos"], start=1):
         vurl = v.get("video_url", "")
-        if not vurl:
-            continue
-        video_path = out_dir / f"{base}_{i}.mp4"
-        ok = download_video_preferring_requests(vurl, video_path)
-        if not ok:
-            fallback = out_dir / f"v{i}.mp4"
-            download_video_preferring_requests(vurl, fallback)
-
-    # Images (failures won't block JSON)
-    for i, img_url in enumerate(images, start=1):
-        if not img_url:
-            continue
-        img_path = out_dir / f"{base}_{i}.jpg"
-        ok = download_with_requests(img_url, img_path)
-        if not ok:
-            fallback = out_dir / f"img{i}.jpg"
-            download_with_requests(img_url, fallback)
+        if vurl:
+            jobs.append(("video", vurl, out_dir / f"{base}_{i}.mp4", out_dir / f"v{i}.mp4"))
+    for i, img_url in enumerate(result["images"], start=1):
+        if img_url:
+            jobs.append(("image", img_url, out_dir / f"{base}_{i}.jpg", out_dir / f"img{i}.jpg"))
 
-    # JSON (always try to save)
-    json_file = out_dir / f"{base}.json"
+    return {
+        "json_file": out_dir / f"{base}.json",
+        "data": result["data"],
+        "jobs": jobs,
+    }
+
+def run_media_job(job) -> bool:
+    # Failures won't block JSON
+    kind, url, path, fallback = job
+    download = download_video_preferring_requests if kind == "video" else download_with_requests
+    if download(url, path):
+        return True
+    return download(url, fallback)
+
+def write_campaign_json(json_file: Path, data: Dict[str, Any]) -> None:
     try:
         with open(windows_longpath(json_file), "w", encoding="utf-8-sig") as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
@@ -470,6 +503,109 @@ def process_and_save_campaign(result: Dict[str, Any]) -> None:
     except Exception as e:
         print(f"[ERROR] Failed to write JSON {json_file}: {e}")
 
+def process_and_save_campaign(result: Dict[str, Any]) -> None:
+    plan = plan_campaign(result)
+    for job in plan["jobs"]:
+        run_media_job(job)
+    # JSON (always try to save)
+    write_campaign_json(plan["json_file"], plan["data"])
+
+_STOP = object()
+
+class _PendingCampaign:
+    def __init__(self, json_file: Path, data: Dict[str, Any], remaining: int):
+        self.json_file = json_file
+        self.data = data
+        self.remaining = remaining
+        self.lock = threading.Lock()
+
+    def job_done(self) -> bool:
+        with self.lock:
+            self.remaining -= 1
+            return self.remaining == 0
+
+class DownloadPipeline:
+    """
+    Media downloads run on their own thread pool, fed by a bounded queue, so
+    the driver moves on to the next campaign as soon as a page is parsed.
+    A campaign's JSON is written once its last media job has finished (it is
+    the skip marker for already_downloaded, so it must not appear early).
+
+    Only one job per destination path is in flight at a time: a duplicate
+    URL/slug submitted while the first is still queued or downloading waits
+    on that job instead of streaming into the same .part concurrently.
+    """
+
+    def __init__(self, workers: int = DOWNLOAD_WORKERS, queue_size: int = DOWNLOAD_QUEUE_SIZE):
+        self.jobs: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self.threads = []
+        self.completed = 0
+        self.duplicates = 0
+        self._lock = threading.Lock()
+        self._inflight: Dict[Path, List[_PendingCampaign]] = {}  # path -> campaigns waiting on its job
+        for n in range(1, workers + 1):
+            t = threading.Thread(target=self._worker, name=f"download-{n}", daemon=True)
+            t.start()
+            self.threads.append(t)
+
+    def submit(self, result: Dict[str, Any]) -> None:
+        plan = plan_campaign(result)
+        if not plan["jobs"]:
+            write_campaign_json(plan["json_file"], plan["data"])
+            return
+        pending = _PendingCampaign(plan["json_file"], plan["data"], len(plan["jobs"]))
+        for job in plan["jobs"]:
+            path = job[2]
+            with self._lock:
+                waiters = self._inflight.get(path)
+                if waiters is not None:
+                    waiters.append(pending)  # counted done when the job already queued for this path finishes
+                    self.duplicates += 1
+                    continue
+                self._inflight[path] = [pending]
+            self.jobs.put(job)  # blocks while the download backlog is full
+
+    def _job_finished(self, pending: _PendingCampaign) -> None:
+        if pending.job_done():
+            write_campaign_json(pending.json_file, pending.data)
+            with self._lock:
+                self.completed += 1
+
+    def _worker(self) -> None:
+        while True:
+            item = self.jobs.get()
+            if item is _STOP:
+                return
+            job = item
+            try:
+                run_media_job(job)
+            except Exception as e:
+                print(f"[ERROR] Download job failed for {job[1]}: {e}")
+            with self._lock:
+                waiters = self._inflight.pop(job[2])
+            for pending in waiters:
+                self._job_finished(pending)
+
+    def close(self) -> None:
+        """Wait for every queued job, then stop the workers."""
+        if self.threads:
+            print(f"[INFO] Waiting for {self.jobs.qsize()} queued downloads...")
+        for _ in self.threads:
+            self.jobs.put(_STOP)
+        for t in self.threads:
+            t.join()
+        print(f"[INFO] Download pipeline finished {self.completed} campaigns with media"
+              + (f" ({self.duplicates} duplicate jobs shared an in-flight download)." if self.duplicates else "."))
+
+def save_campaign(result: Dict[str, Any], pipeline: Optional[DownloadPipeline]) -> None:
+    if pipeline is None:
+        process_and_save_campaign(result)
+    else:
+        pipeline.submit(result)
+
+def make_pipeline() -> Optional[DownloadPipeline]:
+    return DownloadPipeline(DOWNLOAD_WORKERS) if DOWNLOAD_WORKERS > 0 else None
+
 # =========================
 # Main
 # =========================
@@ -487,27 +623,14 @@ def read_campaign_links(file_path: str) -> List[str]:
             urls.append(line)
     return urls
 
-def main():
-    try:
-        urls = read_campaign_links(CAMPAIGN_LIST_FILE)
-        urls = urls[1725:3000]  # Limit for testing
-    except FileNotFoundError as e:
-        print(f"[ERROR] {e}")
-        return
-    except Exception as e:
-        print(f"[ERROR] {e}")
-        return
-
-    if not urls:
-        print("[INFO] No campaign URLs found.")
-        return
-
+def crawl_sequential(urls: List[str]) -> None:
     try:
         driver = get_selenium_driver()
     except Exception as e:
         print(f"[ERROR] {e}")
         return
 
+    pipeline = make_pipeline()
     try:
         for idx, url in enumerate(urls, start=1):
             print(f"\n=== ({idx}/{len(urls)}) {url} ===")
@@ -521,7 +644,7 @@ def main():
                 if already_downloaded(result["title_slug"], expected_name, url):
                     continue
 
-                process_and_save_campaign(result)
+                save_campaign(result, pipeline)
             except Exception as e:
                 print(f"[ERROR] Unexpected error for {url}: {e}")
             time.sleep(SLEEP_BETWEEN_PAGES)
@@ -530,6 +653,124 @@ def main():
             driver.quit()
         except Exception:
             pass
+        if pipeline:
+            pipeline.close()
+
+# =========================
+# Pooled mode
+# =========================
+
+def _pool_worker(worker_id: int, work: "queue.Queue", results: "queue.Queue", total: int) -> None:
+    """
+    Own one Chrome driver and parse URLs from the shared work queue until it
+    is drained. Parsed campaigns go to the results queue; saving is left to
+    the single writer so two workers never write the same folder.
+    """
+    try:
+        driver = get_selenium_driver()
+    except Exception as e:
+        print(f"[ERROR] Worker {worker_id}: {e}")
+        return
+
+    try:
+        while True:
+            try:
+                idx, url = work.get_nowait()
+            except queue.Empty:
+                break
+            print(f"\n=== [w{worker_id}] ({idx}/{total}) {url} ===")
+            try:
+                result = parse_campaign(driver, url)
+                if not result:
+                    print(f"[WARN] [w{worker_id}] Skipping campaign due to previous errors.")
+                else:
+                    results.put(result)
+            except Exception as e:
+                print(f"[ERROR] [w{worker_id}] Unexpected error for {url}: {e}")
+            time.sleep(SLEEP_BETWEEN_PAGES)
+    finally:
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+def _pool_writer(results: "queue.Queue", pipeline: Optional[DownloadPipeline] = None) -> None:
+    while True:
+        result = results.get()
+        if result is _STOP:
+            return
+        url = result["data"]["origin"]["url"]
+        try:
+            expected_name = result["data"]["name"]
+            if already_downloaded(result["title_slug"], expected_name, url):
+                continue
+            save_campaign(result, pipeline)
+        except Exception as e:
+            print(f"[ERROR] Failed to save {url}: {e}")
+
+def crawl_pooled(urls: List[str], workers: int = POOL_WORKERS) -> None:
+    work: "queue.Queue" = queue.Queue()
+    for idx, url in enumerate(urls, start=1):
+        work.put((idx, url))
+    results: "queue.Queue" = queue.Queue(maxsize=RESULT_QUEUE_SIZE)
+
+    pipeline = make_pipeline()
+    writer = threading.Thread(target=_pool_writer, args=(results, pipeline), name="writer", daemon=True)
+    writer.start()
+
+    threads = []
+    for wid in range(1, min(workers, len(urls)) + 1):
+        t = threading.Thread(
+            target=_pool_worker,
+            args=(wid, work, results, len(urls)),
+            name=f"worker-{wid}",
+            daemon=True,
+        )
+        t.start()
+        threads.append(t)
+
+    for t in threads:
+        t.join()
+    results.put(_STOP)
+    writer.join()
+    if pipeline:
+        pipeline.close()
+
+    if not work.empty():
+        print(f"[WARN] {work.qsize()} URLs were not processed (no driver could start).")
+
+def main():
+    try:
+        urls = read_campaign_links(CAMPAIGN_LIST_FILE)
+        urls = urls[URL_SLICE]
+    except FileNotFoundError as e:
+        print(f"[ERROR] {e}")
+        return
+    except Exception as e:
+        print(f"[ERROR] {e}")
+        return
+
+    if not urls:
+        print("[INFO] No campaign URLs found.")
+        return
+
+    if CONTENT_STORE:
+        use_content_store(OUTPUT_ROOT.parent / ".media_store")
+    SCHEDULER.configure(BANDWIDTH_CAP_MB)
+
+    if POOL_WORKERS > 1:
+        crawl_pooled(urls, POOL_WORKERS)
+    else:
+        crawl_sequential(urls)
+    RATE_LIMITER.report()
+    HTTP_CACHE.report()
+    DOWNLOAD_STATS.report()
+    if media_downloader.STORE:
+        media_downloader.STORE.report()
+    YTDLP.close()
+    YTDLP.report()
+    HOST_CLASSES.report()
+    SCHEDULER.report()
 
 if __name__ == "__main__":
     main()
@@ -4,13 +4,30 @@ from pathlib import Path
 # Root folder (adjust this to your actual path)
 root = Path("adsoftheworld/professionals_done")
 
+# A .part with a .part.json next to it can be resumed by media_downloader
+# (Range request validated by ETag/Last-Modified); only orphans are deleted.
+KEEP_RESUMABLE = True
+
+kept = 0
+
 # Iterate through all subdirectories and files
 for subdir, _, files in os.walk(root):
     for file in files:
         if file.endswith(".part"):
             file_path = Path(subdir) / file
+            if KEEP_RESUMABLE and (file + ".json") in files:
+                kept += 1
+                continue
             try:
                 os.remove(file_path)
                 print(f"✅ Deleted: {file_path}")
             except Exception as e:
                 print(f"❌ Could not delete {file_path}: {e}")
+        elif file.endswith(".part.json") and file[:-len(".json")] not in files:
+            try:
+                os.remove(Path(subdir) / file)
+            except Exception:
+                pass
+
+if kept:
+    print(f"↪️ Kept {kept} resumable .part files")
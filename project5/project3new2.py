@@ -149,13 +149,24 @@
 # driver.quit()
 
 
-import os, time, json, requests, subprocess
+import os, sys, time, json
 from bs4 import BeautifulSoup
 import undetected_chromedriver as uc
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import media_downloader
+from ytdlp_engine import YtDlpEngine
+from network_capture import (
+    enable_performance_logging, drain_performance_log, capture_json_responses, first_value, media_urls
+)
+
+# "network": build the record from the palmares XHR JSON (DOM parse only as fallback)
+# "dom":     wait for md-sidenav and parse the rendered HTML
+EXTRACTION_MODE = "network"
+
 def sanitize_filename(name):
     if not name:
         return "project"
@@ -163,38 +174,93 @@ def sanitize_filename(name):
     return "".join(c for c in name if c.isalnum() or c == " ").strip()
 
 def download_file(url, path):
-    try:
-        r = requests.get(url, timeout=20)
-        with open(path, "wb") as f:
-            f.write(r.content)
-        print(f"⬇️ Saved: {path}")
-    except Exception as e:
-        print(f"❌ Failed {url}: {e}")
+    media_downloader.download_file(url, path, skip_existing=False)
+
+YTDLP = YtDlpEngine(workers=1)
 
 def download_vimeo(url, path):
-    """Download Vimeo video using yt-dlp (must be installed)."""
-    try:
-        subprocess.run(
-            ["yt-dlp", "-o", path, url],
-            check=True
-        )
-        print(f"🎬 Downloaded video: {path}")
-    except Exception as e:
-        print(f"⚠️ Could not download video {url}: {e}")
+    """Download Vimeo video with the in-process yt-dlp engine."""
+    return YTDLP.download(url, path)
 
 options = uc.ChromeOptions()
 options.add_argument("--no-sandbox")
 options.add_argument("--disable-dev-shm-usage")
 options.add_argument("--disable-gpu")
 options.add_argument("--window-size=1920,1080")
+if EXTRACTION_MODE == "network":
+    enable_performance_logging(options)
 
 driver = uc.Chrome(use_subprocess=True, options=options)
 
-def scrape_project(entry):
-    url = entry["origin"]["url"]
-    print(f"🔍 Visiting: {url}")
-    driver.get(url)
+def _label(value):
+    """JSON fields may be plain strings or {"name": ...} objects."""
+    if isinstance(value, dict):
+        value = first_value(value, ("name", "title", "label", "libelle", "nom"))
+    return " ".join(value.split()) if isinstance(value, str) else None
+
+def project_from_payloads(entry, payloads):
+    """
+    Build the project from the captured JSON. Returns None when nothing that
+    looks like a project came back, so the caller can fall back to the DOM.
+    """
+    if not payloads:
+        return None
+
+    # Only a response whose URL carries the palmares id describes this project;
+    # config, i18n or related-item JSON must not become the record
+    palmares_id = entry["origin"]["url"].rstrip("/").split("/")[-1]
+    matching = [p for p in payloads if palmares_id and palmares_id in p[0]]
+    if not matching:
+        return None
+    data = matching[0][1]
+
+    name = _label(first_value(data, ("title", "titre", "name")))
+    if not name:
+        return None
 
+    project = entry.copy()
+    for key in ("credits", "videos", "image_urls"):
+        project[key] = list(entry.get(key) or [])  # appended to below; the caller's entry stays untouched
+    project["name"] = name
+
+    category = _label(first_value(data, ("category", "categorie", "catégorie")))
+    if category:
+        project["category"] = category
+    sub_category = _label(first_value(data, ("subCategory", "sub_category", "souscategorie", "sous_categorie")))
+    if sub_category:
+        project["subCategory"] = sub_category
+
+    synopsis = first_value(data, ("synopsis", "description"))
+    if isinstance(synopsis, str):
+        project["description"] = " ".join(BeautifulSoup(synopsis, "html.parser").stripped_strings)
+
+    credits = first_value(data, ("credits", "credit", "credits_list"))
+    if isinstance(credits, list):
+        for c in credits:
+            if not isinstance(c, dict):
+                continue
+            role = _label(first_value(c, ("role", "fonction", "job", "title")))
+            person = _label(first_value(c, ("name", "nom", "fullname", "full_name")))
+            if role and person:
+                credit = {"role": role, "name": person}
+                if credit not in project["credits"]:
+                    project["credits"].append(credit)
+
+    images, videos = media_urls(matching[:1])
+    for src in videos:
+        if {"video_url": src} not in project["videos"]:
+            project["videos"].append({"video_url": src})
+    for src in images:
+        if src not in project["image_urls"]:
+            project["image_urls"].append(src)
+    if project["videos"]:
+        project["type"] = "video"
+    elif project["image_urls"]:
+        project["type"] = "image"
+
+    return project
+
+def project_from_dom(entry):
     # Wait until sidenav loads
     try:
         WebDriverWait(driver, 15).until(
@@ -202,7 +268,7 @@ def scrape_project(entry):
         )
     except:
         print("❌ Timed out waiting for project content")
-        return
+        return None
 
     soup = BeautifulSoup(driver.page_source, "html.parser")
 
@@ -257,6 +323,9 @@ def scrape_project(entry):
     if not project["videos"] and project["image_urls"]:
         project["type"] = "image"
 
+    return project
+
+def save_project(project):
     # --- Save JSON ---
     safe_name = sanitize_filename(project["name"])
     out_dir = os.path.join("test2", safe_name)
@@ -277,6 +346,25 @@ def scrape_project(entry):
         fname = os.path.join(out_dir, f"{safe_name} {i}.mp4")
         download_vimeo(video["video_url"], fname)
 
+def scrape_project(entry):
+    url = entry["origin"]["url"]
+    print(f"🔍 Visiting: {url}")
+    if EXTRACTION_MODE == "network":
+        drain_performance_log(driver)
+    driver.get(url)
+
+    project = None
+    if EXTRACTION_MODE == "network":
+        project = project_from_payloads(entry, capture_json_responses(driver))
+        if project is None:
+            print("ℹ️ No usable JSON captured → parsing the rendered page")
+    if project is None:
+        project = project_from_dom(entry)
+    if project is None:
+        return
+
+    save_project(project)
+
 # 🔄 Main loop: load JSON list and iterate
 with open("data-copy.json", "r", encoding="utf-8") as f:
     entries = json.load(f)
@@ -285,3 +373,6 @@ for entry in entries:
     scrape_project(entry)
 
 driver.quit()
+media_downloader.DOWNLOAD_STATS.report()
+YTDLP.close()
+YTDLP.report()
@@ -3,6 +3,8 @@
 # from selenium import webdriver
 # from bs4 import BeautifulSoup
 # import undetected_chromedriver as uc
+
+import media_downloader
 # import os
 
 # # Setup Chrome
@@ -138,7 +140,6 @@ import os
 import re
 import time
 import json
-import requests
 from urllib.parse import urlparse
 from pathlib import Path
 from selenium import webdriver
@@ -152,17 +153,7 @@ def safe_filename(name: str) -> str:
     return re.sub(r'[\\/*?:"<>|]', "_", name.strip()) or "Unnamed"
 
 def download_file(url, dest_path):
-    try:
-        r = requests.get(url, timeout=20, stream=True)
-        if r.status_code == 200:
-            with open(dest_path, "wb") as f:
-                for chunk in r.iter_content(1024):
-                    f.write(chunk)
-            print(f"      📥 Saved: {dest_path}")
-        else:
-            print(f"      ⚠️ Failed download: {url}")
-    except Exception as e:
-        print(f"      ❌ Error downloading {url}: {e}")
+    media_downloader.download_file(url, dest_path, skip_existing=False)
 
 def get_detail(proj_soup, label):
     tag = proj_soup.find("span", string=label)
@@ -327,4 +318,5 @@ for year in range(2012, 2026):
             print(f"          ✅ Saved project: {name}")
 
 driver.quit()
+media_downloader.DOWNLOAD_STATS.report()
 print("\n✅ Finished scraping")
@@ -2,7 +2,7 @@ import os
 import re
 import time
 import json
-import requests
+import sys
 import platform
 from urllib.parse import urlparse
 from pathlib import Path
@@ -10,6 +10,23 @@ from selenium import webdriver
 from bs4 import BeautifulSoup
 import undetected_chromedriver as uc
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from browser_session import HandoffFetcher
+from bandwidth import SCHEDULER
+from snapshot_archive import SnapshotArchive
+from media_downloader import download_file, DOWNLOAD_STATS
+
+# Clear the anti-bot check once in Chrome, then fetch category and project
+# pages over HTTP with the browser's cookies (False = every page via Chrome)
+HTTP_HANDOFF = True
+# Every fetched page is kept in a compressed snapshot archive. REPLAY = True
+# re-parses the archive offline (no browser, no network, no media downloads)
+# and rewrites the project JSONs in place, e.g. after a selector fix.
+ARCHIVE = SnapshotArchive()
+REPLAY = False
+BANDWIDTH_CAP_MB = 25  # MB/s for all downloads together (pages > thumbnails > images > videos); None = unlimited
+SCHEDULER.configure(BANDWIDTH_CAP_MB)
+
 # -------------------
 # Helpers
 # -------------------
@@ -38,21 +55,35 @@ def windows_longpath(p: Path) -> str:
         return "\\\\?\\" + p_str
     return str(p)
 
-def download_file(url, dest_path: Path):
-    try:
-        if dest_path.exists():
-            return  # Skip if already downloaded
-        r = requests.get(url, timeout=20, stream=True)
-        if r.status_code == 200:
-            dest_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(windows_longpath(dest_path), "wb") as f:
-                for chunk in r.iter_content(1024):
-                    f.write(chunk)
-            print(f"      📥 Saved: {dest_path}")
-        else:
-            print(f"      ⚠️ Failed download: {url}")
-    except Exception as e:
-        print(f"      ❌ Error downloading {url}: {e}")
+def find_project_folder(category_path: Path, folder_name: str, file_safe_name: str, project_url: str):
+    """
+    (folder, found): the folder an earlier run saved this project's JSON in, or
+    the first free candidate (`name`, `name_1`, ...) when it was never saved.
+    """
+    candidate = category_path / folder_name
+    counter = 1
+    while (candidate / f"{file_safe_name}.json").exists():
+        try:
+            with open(windows_longpath(candidate / f"{file_safe_name}.json"), "r", encoding="utf-8") as f:
+                if json.load(f).get("origin", {}).get("url") == project_url:
+                    return candidate, True
+        except Exception:
+            pass
+        candidate = category_path / f"{folder_name}_{counter}"
+        counter += 1
+    return candidate, False
+
+def replay_project_path(category_path: Path, folder_name: str, file_safe_name: str, project_url: str) -> Path:
+    """In replay mode, find the folder the original run used for this project."""
+    return find_project_folder(category_path, folder_name, file_safe_name, project_url)[0]
+
+def item_names(item):
+    """(project_url, name, folder_name, file_safe_name) for a category-page item."""
+    link_tag = item.select_one("div.campaign-thumb a")
+    name_tag = item.select_one("h4 a")
+    name = name_tag.get_text(strip=True) if name_tag else "Unnamed"
+    project_url = link_tag.get("href") if link_tag else None
+    return project_url, name, safe_filename(name, max_length=50), safe_filename(name, max_length=100)
 
 def get_detail(proj_soup, label):
     tag = proj_soup.find("span", string=label)
@@ -82,7 +113,8 @@ options.add_argument("--start-maximized")
 options.add_argument("--disable-infobars")
 options.add_argument("user-agent=Mozilla/5.0")
 
-driver = webdriver.Chrome(options=options)
+driver = None if REPLAY else webdriver.Chrome(options=options)
+fetcher = HandoffFetcher(driver, enabled=HTTP_HANDOFF, archive=ARCHIVE, replay=REPLAY, source="unblock.coffee")
 
 # -------------------
 # Main Loop
@@ -96,9 +128,7 @@ for award_name, base_pattern in AWARDS.items():
     for year in range(2025, 2011, -1):
         base_url = base_pattern.format(year=year)
         print(f"\n🔎 {award_name} | Year {year}: {base_url}")
-        driver.get(base_url)
-
-        soup = BeautifulSoup(driver.page_source, "html.parser")
+        soup = BeautifulSoup(fetcher.get(base_url) or "", "html.parser")
         category_links = [a["href"] for a in soup.select("section.award-categories-grid a.award-category-card")]
 
         if not category_links:
@@ -106,6 +136,7 @@ for award_name, base_pattern in AWARDS.items():
             continue
 
         print(f"   Found {len(category_links)} categories")
+        category_pages = fetcher.get_many(category_links)
 
         for category_url in category_links:
             # Replace hyphens with underscores in folder names
@@ -115,9 +146,7 @@ for award_name, base_pattern in AWARDS.items():
             category_path.mkdir(parents=True, exist_ok=True)
 
             print(f"\n  ▶ Category: {category_name}")
-            driver.get(category_url)
-
-            cat_soup = BeautifulSoup(driver.page_source, "html.parser")
+            cat_soup = BeautifulSoup(category_pages.get(category_url) or "", "html.parser")
             project_items = cat_soup.select("div.item")
 
             if not project_items:
@@ -125,37 +154,49 @@ for award_name, base_pattern in AWARDS.items():
                 continue
 
             print(f"     Found {len(project_items)} projects")
+            # Projects saved by an earlier run are skipped before prefetching their pages
+            done = set()
+            if not REPLAY:
+                for item in project_items:
+                    url, _, folder_name, file_safe_name = item_names(item)
+                    if url and find_project_folder(category_path, folder_name, file_safe_name, url)[1]:
+                        done.add(url)
+            project_pages = fetcher.get_many(
+                url for url in (item_names(item)[0] for item in project_items) if url and url not in done
+            )
 
             for idx, item in enumerate(project_items, start=1):
-                link_tag = item.select_one("div.campaign-thumb a")
-                project_url = link_tag["href"] if link_tag else None
+                project_url, name, folder_name, file_safe_name = item_names(item)
                 if not project_url:
                     continue
 
                 award_tag = item.select_one(".level2, .level3, .level4, .level5")
                 award_txt = award_tag.get_text(strip=True) if award_tag else None
 
-                name_tag = item.select_one("h4 a")
-                name = name_tag.get_text(strip=True) if name_tag else "Unnamed"
-
-                folder_name = safe_filename(name, max_length=50)
-                file_safe_name = safe_filename(name, max_length=100)
                 print(f"    [{idx}/{len(project_items)}] {project_url} [{award_txt}]")
 
-                project_path = category_path / folder_name
-                counter = 1
-                while project_path.exists():
-                    project_path = category_path / f"{folder_name}_{counter}"
-                    counter += 1
+                if project_url in done:
+                    print(f"       ⏭️ Skipping (already downloaded): {name}")
+                    continue
+
+                proj_html = project_pages.get(project_url)
+                if not proj_html:
+                    print(f"       ⚠️ Could not load project page: {project_url}")
+                    continue
+
+                if REPLAY:
+                    project_path = replay_project_path(category_path, folder_name, file_safe_name, project_url)
+                else:
+                    project_path = category_path / folder_name
+                    counter = 1
+                    while project_path.exists():
+                        project_path = category_path / f"{folder_name}_{counter}"
+                        counter += 1
                 project_path.mkdir(parents=True, exist_ok=True)
 
                 json_file = project_path / f"{file_safe_name}.json"
-                if json_file.exists():
-                    print(f"       ⏭️ Skipping (already downloaded): {name}")
-                    continue
 
-                driver.get(project_url)
-                proj_soup = BeautifulSoup(driver.page_source, "html.parser")
+                proj_soup = BeautifulSoup(proj_html, "html.parser")
 
                 brand = get_detail(proj_soup, "Brand")
                 agency = get_detail(proj_soup, "Agency")
@@ -195,18 +236,19 @@ for award_name, base_pattern in AWARDS.items():
                     elif img_src:
                         images.append(img_src)
 
-                # Download images
-                for i, img_url in enumerate(images, start=1):
-                    ext = os.path.splitext(urlparse(img_url).path)[-1] or ".jpg"
-                    dest = project_path / f"{file_safe_name}_{i}{ext}"
-                    download_file(img_url, dest)
+                if not REPLAY:
+                    # Download images
+                    for i, img_url in enumerate(images, start=1):
+                        ext = os.path.splitext(urlparse(img_url).path)[-1] or ".jpg"
+                        dest = project_path / f"{file_safe_name}_{i}{ext}"
+                        download_file(img_url, dest)
 
-                # Download videos
-                for i, vid in enumerate(videos, start=1):
-                    vid_url = vid["video_url"]
-                    ext = os.path.splitext(urlparse(vid_url).path)[-1] or ".mp4"
-                    dest = project_path / f"{file_safe_name}_{i}{ext}"
-                    download_file(vid_url, dest)
+                    # Download videos
+                    for i, vid in enumerate(videos, start=1):
+                        vid_url = vid["video_url"]
+                        ext = os.path.splitext(urlparse(vid_url).path)[-1] or ".mp4"
+                        dest = project_path / f"{file_safe_name}_{i}{ext}"
+                        download_file(vid_url, dest)
 
                 project_obj = {
                     "origin": {"name": award_name, "url": project_url},
@@ -233,5 +275,10 @@ for award_name, base_pattern in AWARDS.items():
 
                 print(f"          ✅ Saved project: {name}")
 
-driver.quit()
+if driver:
+    driver.quit()
+fetcher.report()
+ARCHIVE.report()
+DOWNLOAD_STATS.report()
+SCHEDULER.report()
 print("\n✅ Finished scraping all awards")
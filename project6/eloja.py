@@ -10,6 +10,12 @@ from selenium import webdriver
 from bs4 import BeautifulSoup
 import undetected_chromedriver as uc
 import base64
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from media_downloader import download_file, stream_to_file, DOWNLOAD_STATS, use_url_index
+from browser_session import session_from_driver
+from bandwidth import IMAGE
 
 # -------------------
 # Helpers
@@ -35,22 +41,6 @@ def windows_longpath(p: Path) -> str:
         return "\\\\?\\" + p_str
     return str(p)
 
-def download_file(url, dest_path: Path):
-    try:
-        if dest_path.exists():
-            return  # Skip if already downloaded
-        r = requests.get(url, timeout=20, stream=True)
-        if r.status_code == 200:
-            dest_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(windows_longpath(dest_path), "wb") as f:
-                for chunk in r.iter_content(1024):
-                    f.write(chunk)
-            print(f"      📥 Saved: {dest_path}")
-        else:
-            print(f"      ⚠️ Failed download: {url}")
-    except Exception as e:
-        print(f"      ❌ Error downloading {url}: {e}")
-
 def get_detail(proj_soup, label):
     tag = proj_soup.find("span", string=label)
     if tag and tag.find_next("a"):
@@ -67,6 +57,47 @@ AWARDS = {
 }
 
 
+URL_INDEX = use_url_index("url_index.jsonl")  # same images recur across awards and categories
+AVIF_SESSION = None  # pooled session carrying the browser's cookies and user agent
+AVIF_HEADERS = {"Accept": "image/avif,image/webp,image/apng,image/*,*/*;q=0.8"}
+
+
+def refresh_avif_session(driver):
+    global AVIF_SESSION
+    AVIF_SESSION = session_from_driver(driver, AVIF_SESSION)
+
+
+def download_avif(driver, url, dest_path: Path, referer: str):
+    """Stream an AVIF over HTTP with the browser's identity; only a 403 goes through the browser."""
+    if dest_path.exists():
+        DOWNLOAD_STATS.add(skipped=1)
+        return
+    if URL_INDEX.materialize(url, dest_path):
+        print(f"      🔗 Linked AVIF (already downloaded): {dest_path}")
+        return
+    if AVIF_SESSION is None:
+        refresh_avif_session(driver)
+    try:
+        written = stream_to_file(url, dest_path, session=AVIF_SESSION, headers=dict(AVIF_HEADERS, Referer=referer),
+                                 priority=IMAGE)
+        DOWNLOAD_STATS.add(files=1, nbytes=written)
+        URL_INDEX.record(url, dest_path)
+        print(f"      📥 Saved AVIF: {dest_path}")
+        return
+    except requests.HTTPError as e:
+        if e.response is None or e.response.status_code != 403:
+            print(f"      ❌ AVIF download failed ({e}): {url}")
+            DOWNLOAD_STATS.add(failed=1)
+            return
+    except Exception as e:
+        print(f"      ❌ AVIF download failed ({e}): {url}")
+        DOWNLOAD_STATS.add(failed=1)
+        return
+    print(f"      🛡️ AVIF 403 over HTTP, using browser: {url}")
+    download_avif_with_selenium(driver, url, dest_path)
+    refresh_avif_session(driver)  # the browser may hold fresher cookies now
+
+
 def download_avif_with_selenium(driver, url, dest_path: Path):
     try:
         if dest_path.exists():
@@ -245,13 +276,16 @@ for award_name, base_pattern in AWARDS.items():
                         images.append(img_src)
 
                 # Download images
+                avif_cookies_synced = False
                 for i, img_url in enumerate(images, start=1):
                     ext = os.path.splitext(urlparse(img_url).path)[-1] or ".jpg"
                     dest = project_path / f"{file_safe_name}_{i}{ext}"
-                    # download_file(img_url, dest)
-                    # AVIF must be downloaded via Selenium
+                    # AVIF needs the browser's cookies; the browser itself is only used on a 403
                     if ext.lower() == ".avif":
-                        download_avif_with_selenium(driver, img_url, dest)
+                        if not avif_cookies_synced:
+                            refresh_avif_session(driver)
+                            avif_cookies_synced = True
+                        download_avif(driver, img_url, dest, referer=project_url)
                     else:
                         download_file(img_url, dest)
 
@@ -289,4 +323,6 @@ for award_name, base_pattern in AWARDS.items():
                 print(f"          ✅ Saved project: {name}")
 
 driver.quit()
+DOWNLOAD_STATS.report()
+URL_INDEX.report()
 print("\n✅ Finished scraping all awards")
@@ -1,10 +1,21 @@
-import time
 import json
 from selenium import webdriver
 from bs4 import BeautifulSoup
 import undetected_chromedriver as uc
 import os
 
+from page_waits import WAIT_STATS
+from chrome_lean import enable_lean_mode
+from browser_session import HandoffFetcher
+from bandwidth import SCHEDULER
+
+LEAN_MODE = True  # only DOM text and image URLs are read here
+# Clear the anti-bot check once in Chrome, then fetch category pages over HTTP
+# with the browser's cookies (False = every page via Chrome)
+HTTP_HANDOFF = True
+BANDWIDTH_CAP_MB = 25  # MB/s for the page fetches; None = unlimited
+SCHEDULER.configure(BANDWIDTH_CAP_MB)
+
 # Setup Chrome
 options = uc.ChromeOptions()
 options.add_argument("--no-sandbox")
@@ -18,6 +29,9 @@ options.add_argument("--disable-infobars")
 options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64)")
 
 driver = webdriver.Chrome(options=options)
+if LEAN_MODE:
+    enable_lean_mode(driver)
+fetcher = HandoffFetcher(driver, enabled=HTTP_HANDOFF)
 
 output_file = "data.jsonl"
 
@@ -44,22 +58,20 @@ if os.path.exists(output_file):
 for year in range(2012, 2026):
     base_url = f"https://www.unblock.coffee/cnns/?adsyear={year}"
     print(f"\n🔎 Year {year}: Visiting {base_url}")
-    driver.get(base_url)
-    time.sleep(2)
+    html = fetcher.get(base_url, ready_selector="section.award-categories-grid a.award-category-card",
+                       replaces=2)
 
     # Parse main page for category links
-    soup = BeautifulSoup(driver.page_source, "html.parser")
+    soup = BeautifulSoup(html or "", "html.parser")
     category_links = [a["href"] for a in soup.select("section.award-categories-grid a.award-category-card")]
     print(f"  Found {len(category_links)} categories for {year}")
+    category_pages = fetcher.get_many(category_links, ready_selector="div.item div.campaign-thumb a", replaces=2)
 
     # Loop through each category
     for cidx, category_url in enumerate(category_links, start=1):
         category_name = category_url.split("/")[-1].split("?")[0]
         print(f"  [{cidx}/{len(category_links)}] Category: {category_name}")
-        driver.get(category_url)
-        time.sleep(2)
-
-        cat_soup = BeautifulSoup(driver.page_source, "html.parser")
+        cat_soup = BeautifulSoup(category_pages.get(category_url) or "", "html.parser")
         project_items = cat_soup.select("div.item")
 
         print(f"     Found {len(project_items)} projects in category.")
@@ -137,4 +149,7 @@ for year in range(2012, 2026):
             print("          ✅ Saved")
 
 driver.quit()
+WAIT_STATS.report()
+fetcher.report()
+SCHEDULER.report()
 print(f"\n✅ Finished scraping. Data saved to {output_file}")
@@ -1,7 +1,7 @@
 import time
 import json
 import re
-import requests
+import sys
 import platform
 from pathlib import Path
 import undetected_chromedriver as uc
@@ -12,9 +12,37 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from bs4 import BeautifulSoup
 import undetected_chromedriver as uc
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from page_waits import wait_for_attr, wait_for_document_ready, current_attr, WAIT_STATS
+from chrome_lean import enable_lean_mode, BLOCKED_FONT_PATTERNS, BLOCKED_ANALYTICS_PATTERNS, BLOCKED_MEDIA_PATTERNS
+from media_downloader import download_file, DOWNLOAD_STATS
+from bandwidth import SCHEDULER
+from network_capture import enable_performance_logging, drain_performance_log, capture_json_responses, media_urls
+
+LEAN_MODE = True
+# The gallery only switches slides once their image has loaded, so images stay
+# allowed here; fonts, analytics and video bodies are still blocked (the video
+# src attribute is set before playback starts).
+LEAN_BLOCKED_URLS = BLOCKED_FONT_PATTERNS + BLOCKED_ANALYTICS_PATTERNS + BLOCKED_MEDIA_PATTERNS
+# Read gallery media from the page's XHR JSON; click through the gallery only
+# when no media URLs came back over the network
+NETWORK_CAPTURE = True
+
+ACTIVE_SLIDE_IMG = ".ug-slide-wrapper[style*='z-index: 3'] img"
+VIDEO_PLAYER = ".ug-videoplayer video"
+NETWORK_REQUEST_GRACE = 0.5  # seconds to see the project's XHR start before giving up on the capture
+BANDWIDTH_CAP_MB = 25  # MB/s for all downloads together (pages > thumbnails > images > videos); None = unlimited
+SCHEDULER.configure(BANDWIDTH_CAP_MB)
 # -------------------
 # Helpers
 # -------------------
+def project_id(url: str):
+    """Numeric id from a project URL (/-award/<id>/<slug>/); the project's XHR URLs carry it."""
+    m = re.search(r"/-award/(\d+)", url)
+    return m.group(1) if m else None
+
+
 def safe_filename(name: str, max_length: int = 100) -> str:
     safe = re.sub(r'[\\/*?:"<>|]', "_", name.strip())
     safe = safe.rstrip(" .,")
@@ -36,22 +64,6 @@ def windows_longpath(p: Path) -> str:
         return "\\\\?\\" + p_str
     return str(p)
 
-def download_file(url, dest_path: Path):
-    try:
-        if not url or dest_path.exists():
-            return
-        r = requests.get(url, timeout=20, stream=True)
-        if r.status_code == 200:
-            dest_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(windows_longpath(dest_path), "wb") as f:
-                for chunk in r.iter_content(1024):
-                    f.write(chunk)
-            print(f"📥 Saved: {dest_path}")
-        else:
-            print(f"⚠️ Failed download: {url}")
-    except Exception as e:
-        print(f"❌ Error downloading {url}: {e}")
-
 # -------------------
 # Setup Chrome
 # ------------------
@@ -84,7 +96,12 @@ options.add_argument("--start-maximized")
 options.add_argument("--disable-infobars")
 options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36")
 
+if NETWORK_CAPTURE:
+    enable_performance_logging(options)
+
 driver = uc.Chrome(use_subprocess=True, options=options)
+if LEAN_MODE:
+    enable_lean_mode(driver, LEAN_BLOCKED_URLS)
 # -------------------
 # Login
 # -------------------
@@ -142,7 +159,10 @@ print(f"✅ Loaded {len(project_links)} project links from {links_file}")
 # -------------------
 for idx, project_url in enumerate(project_links, 1):
     print(f"\n▶️ Project {idx}/{len(project_links)}: {project_url}")
-    driver.get(project_url)
+    if NETWORK_CAPTURE:
+        drain_performance_log(driver)
+    with SCHEDULER.page_load():
+        driver.get(project_url)
     time.sleep(0.1)
     # 🛑 Remove the "player-not-allowed" overlay blocker
     # try:
@@ -158,7 +178,7 @@ for idx, project_url in enumerate(project_links, 1):
             print("⚠️ Overlay detected → clearing cookies & refreshing...")
             driver.delete_all_cookies()   # clear cookies
             driver.refresh()              # reload the same project URL
-            time.sleep(2)
+            wait_for_document_ready(driver, replaces=2)
     except:
         print("ℹ️ No overlay found")
 
@@ -431,17 +451,31 @@ for idx, project_url in enumerate(project_links, 1):
     # -------- Media --------
     image_urls, video_list = [], []
 
-    # Try finding bullets first
-    bullets = driver.find_elements(By.CSS_SELECTOR, ".ug-bullet")
+    pid = project_id(project_url)
+    if NETWORK_CAPTURE and pid:
+        # Only the project's own responses: related-project and recommendation JSON carries other campaigns' media
+        payloads = capture_json_responses(driver, url_contains=pid, timeout=3, request_grace=NETWORK_REQUEST_GRACE)
+        net_images, net_videos = media_urls(payloads)
+        image_urls = [fix_url(u) for u in net_images]
+        video_list = [{"video_url": fix_url(u), "thumbnail": None} for u in net_videos]
+
+    # Try finding bullets first (only needed when the network gave us nothing)
+    bullets = [] if (image_urls or video_list) else driver.find_elements(By.CSS_SELECTOR, ".ug-bullet")
 
-    if bullets:
+    if image_urls or video_list:
+        print(f"   📡 Captured {len(image_urls)} images and {len(video_list)} videos from XHR JSON")
+    elif bullets:
         print(f"   🎯 Found {len(bullets)} bullets, iterating...")
         for bidx, bullet in enumerate(bullets, 1):
             try:
                 driver.execute_script("arguments[0].scrollIntoView(true);", bullet)
                 time.sleep(0.1)
+                already_active = "ug-bullet-active" in (bullet.get_attribute("class") or "")
+                old_src = current_attr(driver, ACTIVE_SLIDE_IMG, "src")
                 driver.execute_script("arguments[0].click();", bullet)
-                time.sleep(1)  # Increased wait time to allow media to load
+                # Wait for the newly selected slide (its src must change) instead of a fixed 1s
+                if not already_active:
+                    wait_for_attr(driver, ACTIVE_SLIDE_IMG, "src", timeout=2, replaces=1, not_value=old_src)
 
                 msoup = BeautifulSoup(driver.page_source, "html.parser")
 
@@ -461,8 +495,9 @@ for idx, project_url in enumerate(project_links, 1):
                         ".ug-slide-wrapper[style*='z-index: 3'] .ug-button-videoplay"
                     )
                     if play_btn.is_displayed():
+                        old_video_src = current_attr(driver, VIDEO_PLAYER, "src")
                         driver.execute_script("arguments[0].click();", play_btn)
-                        time.sleep(1)  # Give time for video to load
+                        wait_for_attr(driver, VIDEO_PLAYER, "src", replaces=1, not_value=old_video_src)
 
                         # Extract the video URL
                         video_tag = driver.find_element(By.CSS_SELECTOR, ".ug-videoplayer video")
@@ -492,8 +527,9 @@ for idx, project_url in enumerate(project_links, 1):
         try:
             right_arrow = driver.find_element(By.CSS_SELECTOR, "#mediagallery > div.ug-slider-wrapper > div.ug-slider-control.ug-arrow-right.ug-skin-default")
             if right_arrow:
+                old_src = current_attr(driver, ACTIVE_SLIDE_IMG, "src")
                 driver.execute_script("arguments[0].click();", right_arrow)
-                time.sleep(1)  # Give time for the next media to load
+                wait_for_attr(driver, ACTIVE_SLIDE_IMG, "src", timeout=2, replaces=1, not_value=old_src)
                 print("   🎯 Clicked right arrow to move to next media")
 
                 # Re-fetch the media after clicking right arrow
@@ -513,8 +549,9 @@ for idx, project_url in enumerate(project_links, 1):
                         ".ug-slide-wrapper[style*='z-index: 3'] .ug-button-videoplay"
                     )
                     if play_btn.is_displayed():
+                        old_video_src = current_attr(driver, VIDEO_PLAYER, "src")
                         driver.execute_script("arguments[0].click();", play_btn)
-                        time.sleep(1)  # Give more time for the video to load
+                        wait_for_attr(driver, VIDEO_PLAYER, "src", replaces=1, not_value=old_video_src)
 
                         # After clicking, get the video URL
                         video_tag = driver.find_element(By.CSS_SELECTOR, ".ug-videoplayer video")
@@ -560,8 +597,9 @@ for idx, project_url in enumerate(project_links, 1):
                         ".ug-slide-wrapper[style*='z-index: 3'] .ug-button-videoplay"
                     )
                     if play_btn.is_displayed():
+                        old_video_src = current_attr(driver, VIDEO_PLAYER, "src")
                         driver.execute_script("arguments[0].click();", play_btn)
-                        time.sleep(1)  # Give more time for the video to load
+                        wait_for_attr(driver, VIDEO_PLAYER, "src", replaces=1, not_value=old_video_src)
 
                         # After clicking, get the video URL
                         video_tag = driver.find_element(By.CSS_SELECTOR, ".ug-videoplayer video")
@@ -648,3 +686,6 @@ for idx, project_url in enumerate(project_links, 1):
 
 
 driver.quit()
+WAIT_STATS.report()
+DOWNLOAD_STATS.report()
+SCHEDULER.report()
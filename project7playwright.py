@@ -1,11 +1,16 @@
 import time
 import json
+import asyncio
 import re
-import requests
 import platform
+import threading
 from pathlib import Path
 from bs4 import BeautifulSoup
 from playwright.sync_api import sync_playwright
+from playwright.async_api import async_playwright
+
+from snapshot_archive import SnapshotArchive
+from media_downloader import download_file, DOWNLOAD_STATS
 
 # -------------------
 # Helpers
@@ -31,42 +36,247 @@ def windows_longpath(p: Path) -> str:
         return "\\\\?\\" + p_str
     return str(p)
 
-def download_file(url, dest_path: Path):
-    try:
-        if not url or dest_path.exists():
-            return
-        r = requests.get(url, timeout=20, stream=True)
-        if r.status_code == 200:
-            dest_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(windows_longpath(dest_path), "wb") as f:
-                for chunk in r.iter_content(1024):
-                    f.write(chunk)
-            print(f"📥 Saved: {dest_path}")
-        else:
-            print(f"⚠️ Failed download: {url}")
-    except Exception as e:
-        print(f"❌ Error downloading {url}: {e}")
+def project_id(url: str):
+    """Numeric id from a project URL (/-award/<id>/<slug>/); None when the URL has no id."""
+    m = re.search(r"/-award/(\d+)", url)
+    return m.group(1) if m else None
 
+# Two different projects can still map to one folder (same title, category and
+# year), so save_project holds a per-folder lock while it writes
+_DIR_LOCKS = {}
+_DIR_LOCKS_GUARD = threading.Lock()
+
+def dir_lock(path: Path) -> threading.Lock:
+    with _DIR_LOCKS_GUARD:
+        return _DIR_LOCKS.setdefault(str(path), threading.Lock())
 
 # -------------------
-# Main Scraper with Playwright
+# Settings
 # -------------------
-def scrape_projects():
-    links_file = Path(r"project7\ProjectUrls\oneasia_awards_project_links.txt")
-    if not links_file.exists():
+LINKS_FILE = Path(r"project7\ProjectUrls\oneasia_awards_project_links.txt")
+OUTPUT_ROOT = Path("OneAsia Awards")
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114 Safari/537.36"
+ASYNC_MODE = True  # one headless browser, CONTEXTS isolated contexts pulling from the link list
+CONTEXTS = 4
+# Every project page is archived with the media found by clicking through the
+# gallery. REPLAY = True re-parses the archive offline: no browser, no downloads.
+ARCHIVE = SnapshotArchive()
+REPLAY = False
+
+ACTIVE_SLIDE = ".ug-slide-wrapper[style*='z-index: 3']"
+
+
+def load_project_links():
+    if not LINKS_FILE.exists():
         print("❌ Links file not found!")
-        return
+        return []
 
-    with open(links_file, "r", encoding="utf-8") as f:
+    with open(LINKS_FILE, "r", encoding="utf-8") as f:
         project_links = [line.strip() for line in f if line.strip()]
 
-    print(f"✅ Loaded {len(project_links)} project links from {links_file}")
+    print(f"✅ Loaded {len(project_links)} project links from {LINKS_FILE}")
+    return project_links
+
+
+# -------------------
+# Parsing (shared by the sync and async scrapers)
+# -------------------
+def parse_metadata(psoup):
+    award_name = psoup.select_one(".box-black-top .row h2 span")
+    award_text = award_name.get_text(strip=True) if award_name else None
+    if award_text:
+        award_text = re.sub(r"\bPencil\b", "", award_text, flags=re.I).strip()
+
+    project_title = psoup.select_one(".box-black-top h1")
+    project_title_text = project_title.get_text(strip=True) if project_title else "Unnamed"
+    agency_text = client_text = None
+    for span in psoup.select("h4 span:has(b)"):
+        if "Agency" in span.get_text():
+            agency_text = span.find("b").get_text(strip=True)
+        if "Client" in span.get_text():
+            client_text = span.find("b").get_text(strip=True)
+    category = psoup.find("h4", {"class": "font-grey"})
+    category_text = category.get_text(strip=True) if category else "Uncategorized"
+    award_div = psoup.find("div", class_="pen-awards-box")
+    award_text_final = award_div.h6.get_text(strip=True) if award_div else None
+    if award_text_final:
+        award_text_final = re.sub(r"\bPencil\b", "", award_text_final, flags=re.I).strip()
+
+    # Category cleanup
+    category_text_cleaned = None
+    if award_text:
+        category_text_cleaned = award_text
+
+        # Remove years (e.g., 1990–2099)
+        category_text_cleaned = re.sub(r"\b(19|20)\d{2}\b", "", category_text_cleaned)
+
+        # Remove award brand names dynamically
+        unwanted_brands = [
+            "One Show",
+            "TDC Awards",
+            "OneAsia",
+            "ADC Awards",
+            "ADCE Awards",
+            "Young Ones",
+            "ADC Europe",
+            "ONE Asia"
+        ]
+        for brand in unwanted_brands:
+            category_text_cleaned = re.sub(rf"\b{re.escape(brand)}\b", "", category_text_cleaned, flags=re.I)
+
+        # Clean up leftover symbols and spaces
+        category_text_cleaned = re.sub(r"[-–:|]+", " ", category_text_cleaned)   # replace separators with space
+        category_text_cleaned = re.sub(r"\s{2,}", " ", category_text_cleaned).strip()  # collapse spaces
+
+    if not category_text_cleaned:
+        category_text_cleaned = "Uncategorized"
+
+    # -------- Tags --------
+    tags_div = psoup.select_one(".tag-social-bar .left")
+    tags = [a.get_text(strip=True) for a in tags_div.find_all("a")] if tags_div else []
+    # -------- Descriptions --------
+    descriptions = []
+    for section in psoup.select("div.row > div.col-xs-12"):
+        h3 = section.find("h3")
+        div = section.find("div", class_="font-grey")
+
+        if h3 and div:
+            # Case 1: has heading and text
+            descriptions.append({
+                "heading": h3.get_text(strip=True),
+                "text": div.get_text(" ", strip=True)
+            })
+        elif div:
+            # Case 2: only text block, no heading
+            descriptions.append({
+                "heading": None,
+                "text": div.get_text(" ", strip=True)
+            })
+
+    # -------- Credits --------
+    credits = []
+    for c in psoup.select(".credits-container .row > div"):
+        role = c.find("h4")
+        names = c.find("h6")
+        if role and names:
+            names_clean = [n.strip() for n in names.get_text("\n", strip=True).split("\n") if n.strip()]
+            for nm in names_clean:
+                credits.append({"role": role.get_text(strip=True), "name": nm})
+
+    # -------- Year --------
+    year = None
+    if award_text:
+        m = re.search(r"\b(19|20)\d{2}\b", award_text)
+        if m: year = m.group(0)
+    if not year and project_title_text:
+        m = re.search(r"\b(19|20)\d{2}\b", project_title_text)
+        if m: year = m.group(0)
+    if not year:
+        year = "Unknown"
+
+    return {
+        "title": project_title_text,
+        "agency": agency_text,
+        "client": client_text,
+        "category": category_text,
+        "category_cleaned": category_text_cleaned,
+        "award": award_text_final,
+        "tags": tags,
+        "descriptions": descriptions,
+        "credits": credits,
+        "year": year,
+    }
+
+
+def collect_slide(psoup, image_urls):
+    img = psoup.select_one(f"{ACTIVE_SLIDE} img")
+    if img:
+        src = img.get("src")
+        if src and src not in image_urls:
+            image_urls.append(src)
+            print(f"      🖼️ Collected image {len(image_urls)}")
+
+
+def add_video(video_list, video_src, poster):
+    if video_src and not any(v["video_url"] == video_src for v in video_list):
+        video_list.append({"video_url": video_src, "thumbnail": poster})
+        print(f"      🎬 Collected video {len(video_list)}")
+
+
+def default_media(psoup):
+    image_urls, video_list = [], []
+    img = psoup.select_one(".ug-item-wrapper img")
+    if img:
+        image_urls.append(img.get("src"))
+    video = psoup.select_one(".ug-videoplayer video")
+    if video:
+        video_list.append({"video_url": video.get("src"), "thumbnail": video.get("poster")})
+    return image_urls, video_list
+
+
+def archive_project(project_url, html, image_urls, video_list):
+    ARCHIVE.add(project_url, html, source="oneclub", extra={"image_urls": image_urls, "videos": video_list})
+
+
+def save_project(project_url, meta, image_urls, video_list, download=True):
+    # --- Folder naming
+    folder_name = safe_filename(meta["title"])
+    project_dir = OUTPUT_ROOT / meta["year"] / safe_filename(meta["category_cleaned"]) / folder_name
+    with dir_lock(project_dir):
+        project_dir.mkdir(parents=True, exist_ok=True)
+
+        # --- Save media
+        if download:
+            for i, img_url in enumerate(image_urls, 1):
+                dest = project_dir / f"{folder_name}_{i}.jpg"
+                download_file(img_url, dest)
+            for i, v in enumerate(video_list, 1):
+                dest = project_dir / f"{folder_name}_{i}.mp4"
+                download_file(v["video_url"], dest)
+
+        # -------- Save JSON --------
+        tags = meta["tags"]
+        data = {
+            "origin": {"name": "OneAsia Awards", "url": project_url},
+            "name": meta["title"],
+            "type": "video" if video_list else "image",
+            "sector": ", ".join(tags) if tags else None,
+            "countries": None,
+            "brands": meta["client"],
+            "agency": meta["agency"],
+            "year": meta["year"],
+            "award": meta["award"],
+            "category": meta["category_cleaned"],
+            "subCategory": meta["category"],
+            "description": meta["descriptions"],
+            "credits": meta["credits"],
+            "image_urls": image_urls,
+            "videos": video_list,
+            "tags": None,
+            "product": None
+        }
+        json_name = safe_filename(folder_name) + ".json"
+        json_path = project_dir / json_name
+
+        with open(windows_longpath(json_path), "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+        print(f"✅ Saved {folder_name}")
+
+
+# -------------------
+# Main Scraper with Playwright
+# -------------------
+def scrape_projects():
+    project_links = load_project_links()
+    if not project_links:
+        return
 
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=False)
         context = browser.new_context(
             viewport={"width": 1920, "height": 1080},
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114 Safari/537.36"
+            user_agent=USER_AGENT
         )
         page = context.new_page()
 
@@ -81,108 +291,11 @@ def scrape_projects():
                 page.evaluate("el => el.style.display = 'none'", overlay)
                 print("🛑 Overlay hidden")
 
-
             # Get page source after interaction
-            psoup = BeautifulSoup(page.content(), "html.parser")
-
-            # -----------------------------
-            # Your SAME SELENIUM LOGIC HERE
-            # -----------------------------
-            award_name = psoup.select_one(".box-black-top .row h2 span")
-            award_text = award_name.get_text(strip=True) if award_name else None
-            if award_text:
-                award_text = re.sub(r"\bPencil\b", "", award_text, flags=re.I).strip()
-
-            project_title = psoup.select_one(".box-black-top h1")
-            project_title_text = project_title.get_text(strip=True) if project_title else "Unnamed"
-            agency_text = client_text = None
-            for span in psoup.select("h4 span:has(b)"):
-                if "Agency" in span.get_text():
-                    agency_text = span.find("b").get_text(strip=True)
-                if "Client" in span.get_text():
-                    client_text = span.find("b").get_text(strip=True)
-            category = psoup.find("h4", {"class": "font-grey"})
-            category_text = category.get_text(strip=True) if category else "Uncategorized"
-            award_div = psoup.find("div", class_="pen-awards-box")
-            award_text_final = award_div.h6.get_text(strip=True) if award_div else None
-            if award_text_final:
-                award_text_final = re.sub(r"\bPencil\b", "", award_text_final, flags=re.I).strip()
-
-            # Category cleanup
-            category_text_cleaned = None
-            if award_text:
-                category_text_cleaned = award_text
-
-                # Remove years (e.g., 1990–2099)
-                category_text_cleaned = re.sub(r"\b(19|20)\d{2}\b", "", category_text_cleaned)
-
-                # Remove award brand names dynamically
-                unwanted_brands = [
-                    "One Show",
-                    "TDC Awards",
-                    "OneAsia",
-                    "ADC Awards",
-                    "ADCE Awards",
-                    "Young Ones",
-                    "ADC Europe",
-                    "ONE Asia"
-                ]
-                for brand in unwanted_brands:
-                    category_text_cleaned = re.sub(rf"\b{re.escape(brand)}\b", "", category_text_cleaned, flags=re.I)
-
-                # Clean up leftover symbols and spaces
-                category_text_cleaned = re.sub(r"[-–:|]+", " ", category_text_cleaned)   # replace separators with space
-                category_text_cleaned = re.sub(r"\s{2,}", " ", category_text_cleaned).strip()  # collapse spaces
-
-            if not category_text_cleaned:
-                category_text_cleaned = "Uncategorized"
-
-            
-            # -------- Tags --------
-            tags_div = psoup.select_one(".tag-social-bar .left")
-            tags = [a.get_text(strip=True) for a in tags_div.find_all("a")] if tags_div else []
-            # -------- Descriptions --------
-            descriptions = []
-            for section in psoup.select("div.row > div.col-xs-12"):
-                h3 = section.find("h3")
-                div = section.find("div", class_="font-grey")
-
-                if h3 and div:
-                    # Case 1: has heading and text
-                    descriptions.append({
-                        "heading": h3.get_text(strip=True),
-                        "text": div.get_text(" ", strip=True)
-                    })
-                elif div:
-                    # Case 2: only text block, no heading
-                    descriptions.append({
-                        "heading": None,
-                        "text": div.get_text(" ", strip=True)
-                    })
-
-
-            # -------- Credits --------
-            credits = []
-            for c in psoup.select(".credits-container .row > div"):
-                role = c.find("h4")
-                names = c.find("h6")
-                if role and names:
-                    names_clean = [n.strip() for n in names.get_text("\n", strip=True).split("\n") if n.strip()]
-                    for nm in names_clean:
-                        credits.append({"role": role.get_text(strip=True), "name": nm})
-
-            # -------- Year --------
-            year = None
-            if award_text:
-                m = re.search(r"\b(19|20)\d{2}\b", award_text)
-                if m: year = m.group(0)
-            if not year and project_title_text:
-                m = re.search(r"\b(19|20)\d{2}\b", project_title_text)
-                if m: year = m.group(0)
-            if not year:
-                year = "Unknown"
-
-            # Media (images/videos directly from gallery)
+            html = page.content()
+            psoup = BeautifulSoup(html, "html.parser")
+            meta = parse_metadata(psoup)
+
             # -------- Media --------
             image_urls, video_list = [], []
             bullets = page.query_selector_all(".ug-bullet")
@@ -196,27 +309,16 @@ def scrape_projects():
                         bullet.click()
                         time.sleep(0.5)
 
-                        msoup = BeautifulSoup(page.content(), "html.parser")
+                        collect_slide(BeautifulSoup(page.content(), "html.parser"), image_urls)
 
-                        img = msoup.select_one(".ug-slide-wrapper[style*='z-index: 3'] img")
-                        if img:
-                            src = img.get("src")
-                            if src and src not in image_urls:
-                                image_urls.append(src)
-                                print(f"      🖼️ Collected image {len(image_urls)}")
-
-                        play_btn = page.query_selector(".ug-slide-wrapper[style*='z-index: 3'] .ug-button-videoplay")
+                        play_btn = page.query_selector(f"{ACTIVE_SLIDE} .ug-button-videoplay")
                         if play_btn and play_btn.is_visible():
                             play_btn.click()
                             time.sleep(0.5)
 
                             video_tag = page.query_selector(".ug-videoplayer video")
                             if video_tag:
-                                video_src = video_tag.get_attribute("src")
-                                poster = video_tag.get_attribute("poster")
-                                if video_src and not any(v["video_url"] == video_src for v in video_list):
-                                    video_list.append({"video_url": video_src, "thumbnail": poster})
-                                    print(f"      🎬 Collected video {len(video_list)}")
+                                add_video(video_list, video_tag.get_attribute("src"), video_tag.get_attribute("poster"))
 
                             close_btn = page.query_selector(".ug-videoplayer-button-close")
                             if close_btn:
@@ -227,60 +329,159 @@ def scrape_projects():
                         print(f"      ⚠️ Skipped bullet {bidx}: {e}")
             else:
                 print("   ⚠️ No bullets found → grabbing default media")
-                msoup = BeautifulSoup(page.content(), "html.parser")
-                img = msoup.select_one(".ug-item-wrapper img")
-                if img:
-                    image_urls.append(img.get("src"))
-                video = msoup.select_one(".ug-videoplayer video")
-                if video:
-                    video_list.append({"video_url": video.get("src"), "thumbnail": video.get("poster")})
-
-
-            # --- Folder naming
-            folder_name = safe_filename(project_title_text)
-            project_dir = Path("OneAsia Awards") / year / safe_filename(category_text_cleaned) / folder_name
-            project_dir.mkdir(parents=True, exist_ok=True)
-
-            # Save media
-            # --- Save media
-            for i, img_url in enumerate(image_urls, 1):
-                dest = project_dir / f"{folder_name}_{i}.jpg"
-                download_file(img_url, dest)
-            for i, v in enumerate(video_list, 1):
-                dest = project_dir / f"{folder_name}_{i}.mp4"
-                download_file(v["video_url"], dest)
+                image_urls, video_list = default_media(BeautifulSoup(page.content(), "html.parser"))
 
-            # Save JSON
-             # -------- Save JSON --------
-            data = {
-                "origin": {"name": "OneAsia Awards", "url": project_url},
-                "name": project_title_text,
-                "type": "video" if video_list else "image",
-                "sector": ", ".join(tags) if tags else None,
-                "countries": None,
-                "brands": client_text,
-                "agency": agency_text,
-                "year": year,
-                "award": award_text_final,
-                "category": category_text_cleaned,
-                "subCategory": category_text,
-                "description": descriptions,
-                "credits": credits,
-                "image_urls": image_urls,
-                "videos": video_list,
-                "tags": None,
-                "product": None
-            }
-            json_name = safe_filename(folder_name) + ".json"
-            json_path = project_dir / json_name
-
-            with open(windows_longpath(json_path), "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-
-            print(f"✅ Saved {folder_name}")
+            archive_project(project_url, html, image_urls, video_list)
+            save_project(project_url, meta, image_urls, video_list)
 
         browser.close()
 
 
+# -------------------
+# Async multi-context scraper
+# -------------------
+ATTR_JS = "([sel, attr]) => { const e = document.querySelector(sel); return e ? e.getAttribute(attr) : null; }"
+ATTR_CHANGED_JS = """([sel, attr, old]) => {
+    const e = document.querySelector(sel);
+    const v = e && e.getAttribute(attr);
+    return !!v && v !== old;
+}"""
+
+
+async def wait_for_attr_change(page, selector, attr, old, timeout):
+    """Wait until `selector`'s `attr` is set and differs from `old` (the value before the click)."""
+    try:
+        await page.wait_for_function(ATTR_CHANGED_JS, arg=[selector, attr, old], timeout=timeout)
+        return True
+    except Exception:
+        return False
+
+
+async def collect_media_async(page):
+    image_urls, video_list = [], []
+    bullets = await page.query_selector_all(".ug-bullet")
+
+    if not bullets:
+        return default_media(BeautifulSoup(await page.content(), "html.parser"))
+
+    for bidx, bullet in enumerate(bullets, 1):
+        try:
+            await bullet.scroll_into_view_if_needed()
+            already_active = "ug-bullet-active" in (await bullet.get_attribute("class") or "")
+            old_src = await page.evaluate(ATTR_JS, [f"{ACTIVE_SLIDE} img", "src"])
+            await bullet.click()
+            # The slide already on screen matches the selector too: wait for its src to change
+            if not already_active:
+                await wait_for_attr_change(page, f"{ACTIVE_SLIDE} img", "src", old_src, 2000)
+
+            collect_slide(BeautifulSoup(await page.content(), "html.parser"), image_urls)
+
+            play_btn = await page.query_selector(f"{ACTIVE_SLIDE} .ug-button-videoplay")
+            if play_btn and await play_btn.is_visible():
+                old_video_src = await page.evaluate(ATTR_JS, [".ug-videoplayer video", "src"])
+                await play_btn.click()
+                video_tag = None
+                if await wait_for_attr_change(page, ".ug-videoplayer video", "src", old_video_src, 3000):
+                    video_tag = await page.query_selector(".ug-videoplayer video")
+                if video_tag:
+                    add_video(video_list, await video_tag.get_attribute("src"), await video_tag.get_attribute("poster"))
+
+                close_btn = await page.query_selector(".ug-videoplayer-button-close")
+                if close_btn:
+                    await close_btn.click()
+
+        except Exception as e:
+            print(f"      ⚠️ Skipped bullet {bidx}: {e}")
+
+    return image_urls, video_list
+
+
+async def context_worker(wid, browser, queue, total):
+    """One isolated browser context (own cookies/cache) pulling links until the queue is empty."""
+    context = await browser.new_context(
+        viewport={"width": 1920, "height": 1080},
+        user_agent=USER_AGENT
+    )
+    page = await context.new_page()
+    try:
+        while True:
+            try:
+                idx, project_url = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            print(f"\n▶️ [c{wid}] Project {idx}/{total}: {project_url}")
+            try:
+                await page.goto(project_url, wait_until="domcontentloaded")
+                try:
+                    await page.wait_for_selector(".box-black-top h1", timeout=10000)
+                except Exception:
+                    pass
+
+                overlay = await page.query_selector("div.player-not-allowed")
+                if overlay:
+                    await page.evaluate("el => el.style.display = 'none'", overlay)
+
+                html = await page.content()
+                meta = parse_metadata(BeautifulSoup(html, "html.parser"))
+                image_urls, video_list = await collect_media_async(page)
+                # Archive writes (gzip + file I/O) and downloads block; keep them off the event loop
+                await asyncio.to_thread(archive_project, project_url, html, image_urls, video_list)
+                await asyncio.to_thread(save_project, project_url, meta, image_urls, video_list)
+            except Exception as e:
+                print(f"❌ [c{wid}] Failed {project_url}: {e}")
+    finally:
+        await context.close()
+
+
+async def scrape_projects_async(contexts=CONTEXTS):
+    project_links = load_project_links()
+    if not project_links:
+        return
+
+    # The same project listed twice would be scraped by two contexts into one folder
+    unique = {}
+    for url in project_links:
+        unique.setdefault(project_id(url) or url, url)
+    if len(unique) < len(project_links):
+        print(f"ℹ️ {len(project_links) - len(unique)} duplicate project links skipped")
+    project_links = list(unique.values())
+
+    queue = asyncio.Queue()
+    for idx, url in enumerate(project_links, 1):
+        queue.put_nowait((idx, url))
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        try:
+            await asyncio.gather(*(
+                context_worker(wid, browser, queue, len(project_links))
+                for wid in range(1, min(contexts, len(project_links)) + 1)
+            ))
+        finally:
+            await browser.close()
+
+
+# -------------------
+# Offline replay from the snapshot archive
+# -------------------
+def replay_projects():
+    project_links = load_project_links()
+    for idx, project_url in enumerate(project_links, 1):
+        record = ARCHIVE.get_record(project_url)
+        if not record:
+            print(f"⚠️ ({idx}/{len(project_links)}) No snapshot for {project_url}")
+            continue
+        meta = parse_metadata(BeautifulSoup(record["html"], "html.parser"))
+        extra = record.get("extra") or {}
+        save_project(project_url, meta, extra.get("image_urls", []), extra.get("videos", []), download=False)
+    ARCHIVE.report()
+
+
 if __name__ == "__main__":
-    scrape_projects()
+    if REPLAY:
+        replay_projects()
+    elif ASYNC_MODE:
+        asyncio.run(scrape_projects_async())
+    else:
+        scrape_projects()
+    DOWNLOAD_STATS.report()
@@ -0,0 +1,121 @@
+"""
+Compressed, append-only archive of fetched pages.
+
+Every page a scraper fetches can be appended here, keyed by URL and fetch
+time, so a selector fix only needs a re-parse of the archive instead of a
+re-crawl through Chrome. Each page is stored as its own gzip member in a
+segment file (`segment-00001.gz`), with one line per page in `index.jsonl`
+recording where it lives; reading one page back is a seek plus a decompress.
+
+    archive = SnapshotArchive("snapshots")
+    archive.add(url, driver.page_source, source="unblock.coffee")
+
+    html = archive.get(url)                     # latest snapshot of url
+    for entry in archive.latest().values():     # replay everything
+        record = archive.read(entry)            # {"url", "fetched_at", "html", "extra"}
+"""
+import gzip
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+SNAPSHOT_DIR = "snapshots"
+SEGMENT_MAX_BYTES = 512 * 1024 * 1024
+COMPRESS_LEVEL = 6
+
+
+class SnapshotArchive:
+    def __init__(self, root: str = SNAPSHOT_DIR, segment_max_bytes: int = SEGMENT_MAX_BYTES):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.root / "index.jsonl"
+        self.segment_max_bytes = segment_max_bytes
+        self._lock = threading.Lock()
+        self._latest: Optional[Dict[str, dict]] = None
+        self.added = 0
+
+    # ---------- writing ----------
+    def _current_segment(self) -> Path:
+        segments = sorted(self.root.glob("segment-*.gz"))
+        if segments and segments[-1].stat().st_size < self.segment_max_bytes:
+            return segments[-1]
+        n = int(segments[-1].stem.split("-")[1]) + 1 if segments else 1
+        return self.root / f"segment-{n:05d}.gz"
+
+    def add(self, url: str, html: str, source: Optional[str] = None, extra: Optional[dict] = None,
+            fetched_at: Optional[float] = None) -> None:
+        """Append one page. `extra` holds data that is not in the HTML (e.g. media found by clicking)."""
+        if not html:
+            return
+        fetched_at = fetched_at or time.time()
+        payload = json.dumps(
+            {"url": url, "fetched_at": fetched_at, "source": source, "html": html, "extra": extra or {}},
+            ensure_ascii=False,
+        ).encode("utf-8")
+        member = gzip.compress(payload, compresslevel=COMPRESS_LEVEL)
+
+        with self._lock:
+            segment = self._current_segment()
+            with open(segment, "ab") as f:
+                offset = f.tell()
+                f.write(member)
+            entry = {
+                "url": url,
+                "fetched_at": fetched_at,
+                "source": source,
+                "segment": segment.name,
+                "offset": offset,
+                "length": len(member),
+            }
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+            if self._latest is not None:
+                self._latest[url] = entry
+            self.added += 1
+
+    # ---------- reading ----------
+    def entries(self) -> Iterator[dict]:
+        if not self.index_path.exists():
+            return
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue  # torn last line after a crash
+
+    def latest(self) -> Dict[str, dict]:
+        """url -> index entry of its most recent snapshot."""
+        with self._lock:
+            if self._latest is None:
+                latest: Dict[str, dict] = {}
+                for entry in self.entries():
+                    prev = latest.get(entry["url"])
+                    if prev is None or entry["fetched_at"] >= prev["fetched_at"]:
+                        latest[entry["url"]] = entry
+                self._latest = latest
+            return self._latest
+
+    def read(self, entry: dict) -> dict:
+        with open(self.root / entry["segment"], "rb") as f:
+            f.seek(entry["offset"])
+            member = f.read(entry["length"])
+        return json.loads(gzip.decompress(member).decode("utf-8"))
+
+    def get_record(self, url: str) -> Optional[dict]:
+        entry = self.latest().get(url)
+        return self.read(entry) if entry else None
+
+    def get(self, url: str) -> Optional[str]:
+        record = self.get_record(url)
+        return record["html"] if record else None
+
+    def size_on_disk(self) -> int:
+        return sum(os.path.getsize(p) for p in self.root.glob("segment-*.gz"))
+
+    def report(self) -> None:
+        print(f"🗄️ Snapshots: {self.added} added this run | "
+              f"{self.size_on_disk() / (1024 * 1024):.1f} MB on disk in {self.root}")
@@ -0,0 +1,117 @@
+"""
+Persistent URL -> local file index for cross-campaign dedup.
+
+A campaign that wins in several award/category listings is downloaded once
+per listing, and the same poster or `img.youtube.com/vi/<id>/0.jpg`
+thumbnail comes back every time. The index remembers where each URL was
+saved; the next time the URL is asked for, the existing file is hardlinked
+to the new destination instead of being fetched again.
+
+    from media_downloader import use_url_index
+    use_url_index("url_index.jsonl")     # download_file consults it before every request
+
+The index is an append-only JSON-lines file (last line for a URL wins), so
+recording a download is one small write. An entry whose file has since been
+deleted or changed size is ignored and the URL is downloaded again. Where
+hardlinks are not possible (another volume) the file is copied, which still
+saves the network transfer.
+"""
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from media_store import link_over
+
+URL_INDEX_FILE = "url_index.jsonl"
+
+
+class UrlIndex:
+    def __init__(self, path: str = URL_INDEX_FILE, longpath=str):
+        self.path = Path(path)
+        self.longpath = longpath  # media_downloader passes windows_longpath
+        self.entries: Dict[str, dict] = self._load()
+        self.linked = 0
+        self.copied = 0
+        self.bytes_avoided = 0
+        self.stale = 0
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, dict]:
+        entries = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        entries[entry["url"]] = entry
+                    except (ValueError, KeyError):
+                        continue  # a line cut short by a crash
+        except OSError:
+            pass
+        return entries
+
+    def lookup(self, url: str) -> Optional[Path]:
+        """The file `url` was saved to, if it is still on disk unchanged."""
+        with self._lock:
+            entry = self.entries.get(url)
+        if entry is None:
+            return None
+        path = Path(entry["path"])
+        try:
+            if os.path.getsize(self.longpath(path)) == entry["size"]:
+                return path
+        except OSError:
+            pass
+        with self._lock:
+            self.entries.pop(url, None)
+            self.stale += 1
+        return None
+
+    def materialize(self, url: str, dest: Path) -> bool:
+        """Put the known copy of `url` at `dest` without a request. False when the URL is unknown."""
+        src = self.lookup(url)
+        if src is None:
+            return False
+        src_s, dest_s = self.longpath(src), self.longpath(dest)
+        if os.path.abspath(src_s) == os.path.abspath(dest_s):
+            return True
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        size = os.path.getsize(src_s)
+        try:
+            link_over(src_s, dest_s)
+            copied = False
+        except OSError:
+            try:
+                tmp = dest_s + ".part"
+                shutil.copyfile(src_s, tmp)
+                os.replace(tmp, dest_s)
+            except OSError:
+                return False
+            copied = True
+        with self._lock:
+            if copied:
+                self.copied += 1
+            else:
+                self.linked += 1
+            self.bytes_avoided += size
+        return True
+
+    def record(self, url: str, dest: Path) -> None:
+        try:
+            size = os.path.getsize(self.longpath(dest))
+        except OSError:
+            return
+        entry = {"url": url, "path": str(Path(dest).resolve()), "size": size}
+        with self._lock:
+            self.entries[url] = entry
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def report(self) -> None:
+        print(f"🔗 URL index: {self.linked} linked, {self.copied} copied instead of downloaded "
+              f"({self.bytes_avoided / (1024 * 1024):.1f} MB avoided), "
+              f"{len(self.entries)} URLs known in {self.path}"
+              + (f", {self.stale} stale entries dropped" if self.stale else ""))
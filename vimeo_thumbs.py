@@ -0,0 +1,125 @@
+"""
+Cached, concurrent Vimeo thumbnail lookups.
+
+The scrapers used to call https://vimeo.com/api/oembed.json inline for every
+Vimeo iframe, so the browser waited on a network round trip per page (even
+for campaigns that were then skipped as already downloaded). Lookups now go
+to a small thread pool and the answers are kept in a JSON map of
+Vimeo ID -> thumbnail URL that survives between runs.
+
+    VIMEO_THUMBS = VimeoThumbResolver()
+
+    video = {"video_url": src, "thumbnail": None}
+    pending.append((video, VIMEO_THUMBS.submit(vimeo_id)))   # returns at once
+    ...                                                      # keep scraping / downloading
+    VIMEO_THUMBS.fill(pending)                               # before the JSON is written
+    VIMEO_THUMBS.close()                                     # end of run: saves the map
+"""
+import json
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from media_downloader import SESSION
+
+VIMEO_THUMBS_FILE = "vimeo_thumbs.json"
+OEMBED_URL = "https://vimeo.com/api/oembed.json?url=https://vimeo.com/{}"
+OEMBED_TIMEOUT = 15
+RESOLVER_WORKERS = 4
+SAVE_EVERY = 25  # new entries between writes of the map
+
+
+class VimeoThumbResolver:
+    def __init__(self, path: str = VIMEO_THUMBS_FILE, workers: int = RESOLVER_WORKERS,
+                 session: Optional[requests.Session] = None):
+        self.path = Path(path)
+        self.session = session or SESSION
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="vimeo-thumb")
+        self.thumbs: Dict[str, Optional[str]] = self._load()
+        self.inflight: Dict[str, Future] = {}
+        self.hits = 0
+        self.lookups = 0
+        self._unsaved = 0
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Optional[str]]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self) -> None:
+        with self._lock:
+            snapshot = dict(self.thumbs)
+            self._unsaved = 0
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, indent=1)
+        os.replace(tmp, self.path)
+
+    def _fetch(self, vimeo_id: str) -> Tuple[bool, Optional[str]]:
+        """(remember, thumbnail). Private/deleted videos (403/404) are remembered as None."""
+        try:
+            r = self.session.get(OEMBED_URL.format(vimeo_id), timeout=OEMBED_TIMEOUT)
+        except requests.RequestException as e:
+            print(f"⚠️ Vimeo oEmbed failed for {vimeo_id}: {e}")
+            return False, None
+        if r.status_code in (403, 404):
+            return True, None
+        if r.status_code != 200:
+            return False, None
+        try:
+            return True, r.json().get("thumbnail_url")
+        except ValueError:
+            return False, None
+
+    def _lookup(self, vimeo_id: str) -> Optional[str]:
+        remember, thumb = self._fetch(vimeo_id)
+        with self._lock:
+            self.inflight.pop(vimeo_id, None)
+            self.lookups += 1
+            if not remember:
+                return thumb  # transient: the next page or run asks again
+            self.thumbs[vimeo_id] = thumb
+            self._unsaved += 1
+            flush = self._unsaved >= SAVE_EVERY
+        if flush:
+            self.save()
+        return thumb
+
+    def submit(self, vimeo_id: str) -> Future:
+        vimeo_id = str(vimeo_id)
+        with self._lock:
+            if vimeo_id in self.thumbs:
+                self.hits += 1
+                done: Future = Future()
+                done.set_result(self.thumbs[vimeo_id])
+                return done
+            fut = self.inflight.get(vimeo_id)
+            if fut is None:
+                fut = self.inflight[vimeo_id] = self.pool.submit(self._lookup, vimeo_id)
+            return fut
+
+    def resolve(self, vimeo_id: str) -> Optional[str]:
+        return self.submit(vimeo_id).result()
+
+    def fill(self, pending: List[Tuple[dict, Future]]) -> None:
+        """Wait for each lookup and write its result into the video's "thumbnail" field."""
+        for video, fut in pending:
+            try:
+                video["thumbnail"] = fut.result()
+            except Exception:
+                video["thumbnail"] = None
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=True)
+        self.save()
+
+    def report(self) -> None:
+        print(f"🖼️ Vimeo thumbnails: {self.hits} from cache, {self.lookups} looked up, "
+              f"{len(self.thumbs)} known in {self.path}")
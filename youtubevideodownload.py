@@ -1,9 +1,11 @@
 # videosdownload.py
 import csv
 import json
+import os
 import re
+import shutil
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from yt_dlp import YoutubeDL
 from datetime import datetime
@@ -13,6 +15,10 @@ import requests
 from http.cookiejar import MozillaCookieJar
 from urllib.parse import urlparse
 
+import media_downloader
+from media_downloader import download_large_file, use_content_store
+from host_classifier import HostClassifier, classify_content_type
+
 # ---------- Settings ----------
 VIDEO_EXTS = {".mp4", ".webm", ".mkv", ".mov", ".avi"}
 VIDEO_HOSTS = ("youtube.com", "youtu.be", "vimeo.com", "player.vimeo.com", "video.adsoftheworld.com")
@@ -22,6 +28,18 @@ HERE = Path(__file__).resolve().parent
 STUDENT_ROOT = HERE / "adsoftheworld" / "professional"
 COOKIES_TXT = HERE / "cookies.txt"
 COOKIES_JSON = HERE / "cookies.json"
+# Batch mode: YouTube/Vimeo embeds from every campaign JSON are collected,
+# deduped by extractor+ID and downloaded once through a single yt-dlp
+# session. DOWNLOAD_ARCHIVE (yt-dlp's --download-archive) remembers finished
+# IDs across runs; VIDEO_ID_MAP records which file holds each ID so other
+# campaigns embedding the same video get a hardlink instead of a download.
+BATCH_MODE = True
+DOWNLOAD_ARCHIVE = HERE / "yt_dlp_archive.txt"
+VIDEO_ID_MAP = HERE / "video_id_map.json"
+# Own store: this script does not count application/octet-stream as video, project4main does,
+# so a host learned there as "direct" must not skip the stricter HEAD check here
+HOST_CLASSES_FILE = HERE / "host_classes_yt.json"
+CONTENT_STORE = True  # direct downloads are stored once by hash and hardlinked into campaign folders
 # ------------------------------
 
 # NEW constants for the direct path
@@ -173,6 +191,145 @@ def prepare_url(u: str) -> str:
     return u
 
 
+# ---------- Batch mode: embeds deduped by extractor+ID ----------
+
+YOUTUBE_ID_RE = re.compile(r"(?:youtube\.com/(?:watch\?(?:.*&)?v=|embed/|shorts/|v/)|youtu\.be/)([A-Za-z0-9_-]{11})")
+VIMEO_ID_RE = re.compile(r"vimeo\.com/(?:video/|channels/[^/]+/)?(\d+)")
+
+
+def embed_key(url: str) -> Optional[str]:
+    """'youtube <id>' / 'vimeo <id>' — the same key format yt-dlp writes to its download archive."""
+    m = YOUTUBE_ID_RE.search(url)
+    if m:
+        return f"youtube {m.group(1)}"
+    m = VIMEO_ID_RE.search(url)
+    if m:
+        return f"vimeo {m.group(1)}"
+    return None
+
+
+def load_archive_keys(path: Path) -> set:
+    if not path.exists():
+        return set()
+    return {line.strip() for line in path.read_text(encoding="utf-8").splitlines() if line.strip()}
+
+
+def load_id_map(path: Path) -> Dict[str, dict]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_id_map(path: Path, id_map: Dict[str, dict]) -> None:
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(id_map, indent=2, ensure_ascii=False), encoding="utf-8")
+    tmp.replace(path)
+
+
+def link_or_copy(src: Path, dest: Path) -> None:
+    if dest.exists():
+        return
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copy2(src, dest)
+
+
+def collect_embeds(campaign_dirs: List[Path]) -> Dict[str, dict]:
+    """key -> {"url", "referer", "targets": [out_file, ...]} for folders still missing a video."""
+    embeds: Dict[str, dict] = {}
+    for campaign_dir in campaign_dirs:
+        if folder_has_any_video(campaign_dir):
+            continue
+        json_path = find_json(campaign_dir)
+        if not json_path:
+            continue
+        try:
+            urls, referer = extract_video_info(json_path)
+        except Exception:
+            continue  # reported by the per-folder pass
+        for idx, raw_url in enumerate(urls, 1):
+            url = prepare_url(raw_url)
+            key = embed_key(url)
+            if not key:
+                continue
+            suffix = "" if len(urls) == 1 else f"_{idx}"
+            entry = embeds.setdefault(key, {"url": url, "referer": referer, "targets": []})
+            entry["targets"].append(campaign_dir / f"{campaign_dir.name}{suffix}.mp4")
+    return embeds
+
+
+def run_batch(embeds: Dict[str, dict], cookies_path: Optional[Path], failures_writer: csv.writer) -> None:
+    archive = load_archive_keys(DOWNLOAD_ARCHIVE)
+    id_map = load_id_map(VIDEO_ID_MAP)
+    todo = {k: e for k, e in embeds.items() if k not in archive}
+    total_targets = sum(len(e["targets"]) for e in embeds.values())
+    print(f"\n▶ Batch: {total_targets} embeds → {len(embeds)} unique videos, "
+          f"{len(embeds) - len(todo)} already in archive, {len(todo)} to download")
+
+    # Videos downloaded on earlier runs: just link them into new folders
+    for key, entry in embeds.items():
+        if key in todo:
+            continue
+        known = id_map.get(key)
+        if not known:
+            print(f"  ⚠️ {key} is in {DOWNLOAD_ARCHIVE.name} but not in {VIDEO_ID_MAP.name}; "
+                  f"cannot link it into {len(entry['targets'])} folder(s)")
+            continue
+        if not Path(known["file"]).exists():
+            print(f"  ⚠️ {key}: archived file {known['file']} is gone; cannot link it")
+            continue
+        for target in entry["targets"]:
+            link_or_copy(Path(known["file"]), target.with_suffix(Path(known["file"]).suffix))
+
+    # YouTube does not care about the referer, Vimeo embeds often do: one YoutubeDL per referer
+    groups: Dict[Optional[str], List[str]] = {}
+    for key, entry in todo.items():
+        referer = entry["referer"] if key.startswith("vimeo") else None
+        groups.setdefault(referer, []).append(key)
+
+    fmt = "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best"
+    for referer, keys in groups.items():
+        opts = {
+            "noplaylist": True,
+            "overwrites": False,
+            "quiet": False,
+            "format": fmt,
+            "download_archive": str(DOWNLOAD_ARCHIVE),
+            "outtmpl": {"default": "%(id)s.%(ext)s"},
+        }
+        if cookies_path and cookies_path.exists():
+            opts["cookiefile"] = str(cookies_path)
+        if referer:
+            opts["http_headers"] = {"Referer": referer}
+
+        with YoutubeDL(opts) as ydl:
+            for n, key in enumerate(keys, 1):
+                entry = todo[key]
+                first = entry["targets"][0]
+                print(f"  ↓ [{n}/{len(keys)}] {key} → {first.parent.name}"
+                      + (f" (+{len(entry['targets']) - 1} more folders)" if len(entry["targets"]) > 1 else ""))
+                ydl.params["outtmpl"]["default"] = str(first.with_suffix("")).replace("%", "%%") + ".%(ext)s"
+                try:
+                    info = ydl.extract_info(entry["url"], download=True)
+                except Exception as e:
+                    print(f"  ✖ Download failed: {entry['url']} ({e})")
+                    for target in entry["targets"]:
+                        failures_writer.writerow([str(target.parent), target.stem, entry["url"], str(e)])
+                    continue
+                if not info:
+                    continue
+                done = (info.get("requested_downloads") or [{}])[0].get("filepath") or ydl.prepare_filename(info)
+                done = Path(done)
+                if not done.exists():
+                    continue
+                for target in entry["targets"][1:]:
+                    link_or_copy(done, target.with_suffix(done.suffix))
+                id_map[key] = {"file": str(done), "folders": [str(t.parent) for t in entry["targets"]]}
+                save_id_map(VIDEO_ID_MAP, id_map)
+
+
 # ---------- NEW: direct-download helpers ----------
 
 def has_direct_file_extension(url: str) -> bool:
@@ -211,12 +368,21 @@ def load_requests_cookies(cookies_path: Optional[Path]) -> Optional[MozillaCooki
         return None
 
 
+HOST_CLASSES = HostClassifier(str(HOST_CLASSES_FILE))
+
+
 def try_head_is_video(url: str, headers: dict, cookies) -> bool:
-    """Confirm via HEAD if Content-Type starts with video/ (best-effort)."""
+    """Confirm via HEAD if Content-Type starts with video/ (best-effort), unless the host is already learned."""
+    known = HOST_CLASSES.classify(url)
+    if known:
+        return known == "direct"
     try:
         r = requests.head(url, headers=headers, cookies=cookies, allow_redirects=True, timeout=15)
-        ct = r.headers.get("Content-Type", "").lower()
-        return ct.startswith("video/")
+        if r.status_code >= 400:
+            return False
+        cls = classify_content_type(r.headers.get("Content-Type", ""), octet_stream_is_video=False)
+        HOST_CLASSES.observe(url, cls)
+        return cls == "direct"
     except Exception:
         return False
 
@@ -234,23 +400,11 @@ def download_via_requests(url: str, out_path: Path, referer: Optional[str], cook
         if not try_head_is_video(url, headers, cookies):
             return False
 
-    tmp_path = out_path.with_suffix(out_path.suffix + ".part")
     try:
-        with requests.get(url, headers=headers, cookies=cookies, stream=True, timeout=30) as r:
-            r.raise_for_status()
-            with tmp_path.open("wb") as f:
-                for chunk in r.iter_content(chunk_size=1024 * 256):
-                    if chunk:
-                        f.write(chunk)
-        tmp_path.replace(out_path)
+        # Large files go as parallel ranged segments; a failed single stream keeps its .part for resuming
+        download_large_file(url, out_path, headers=headers, cookies=cookies, timeout=30)
         return True
     except Exception as e:
-        # Clean up partial file on failure
-        try:
-            if tmp_path.exists():
-                tmp_path.unlink()
-        except Exception:
-            pass
         print(f"  ✖ Direct download failed ({e})")
         return False
 
@@ -263,6 +417,7 @@ def download_urls_to_folder(
     referer: Optional[str],
     cookies_path: Optional[Path],
     failures_writer: csv.writer,
+    skip_embeds: bool = False,
 ):
     if not urls:
         print("  • No video URLs found.")
@@ -281,7 +436,7 @@ def download_urls_to_folder(
         "format": fmt,
     }
     if cookies_path and cookies_path.exists():
-        common["cookies"] = str(cookies_path)
+        common["cookiefile"] = str(cookies_path)
     else:
         print("  ! No cookies available — private/age-restricted embeds may fail.")
     if referer:
@@ -294,6 +449,10 @@ def download_urls_to_folder(
         preferred_name = f"{base_name}{suffix}.mp4"
         out_file = out_dir / preferred_name
 
+        if skip_embeds and embed_key(url):
+            print(f"  • ({idx}/{len(urls)}) {embed_key(url)} left to the batch run.")
+            continue
+
         print(f"  ↓ Downloading ({idx}/{len(urls)}): {url}")
 
         # 1) Fast path for obvious direct-file links
@@ -329,13 +488,19 @@ def main():
         return
 
     cookies_path = ensure_cookies_txt()
+    if CONTENT_STORE:
+        use_content_store(STUDENT_ROOT.parent / ".media_store")
 
     failures_path = HERE / "failed_downloads.csv"
     with failures_path.open("w", newline="", encoding="utf-8") as fcsv:
         failures_writer = csv.writer(fcsv)
         failures_writer.writerow(["folder", "basename", "url", "error"])
 
-        for campaign_dir in sorted(p for p in STUDENT_ROOT.iterdir() if p.is_dir()):
+        campaign_dirs = sorted(p for p in STUDENT_ROOT.iterdir() if p.is_dir())
+        # Collected before any download so the per-folder pass below cannot hide a folder from the batch
+        embeds = collect_embeds(campaign_dirs) if BATCH_MODE else {}
+
+        for campaign_dir in campaign_dirs:
             print(f"\n▶ {campaign_dir.name}")
 
             if folder_has_any_video(campaign_dir):
@@ -354,8 +519,15 @@ def main():
                 failures_writer.writerow([str(campaign_dir), campaign_dir.name, "(none)", f"json_read_error: {e}"])
                 continue
 
-            download_urls_to_folder(urls, campaign_dir, campaign_dir.name, referer, cookies_path, failures_writer)
+            download_urls_to_folder(urls, campaign_dir, campaign_dir.name, referer, cookies_path, failures_writer,
+                                    skip_embeds=BATCH_MODE)
+
+        if embeds:
+            run_batch(embeds, cookies_path, failures_writer)
 
+    HOST_CLASSES.report()
+    if media_downloader.STORE:
+        media_downloader.STORE.report()
     print(f"\nDone. Failures (if any) logged to: {failures_path}")
 
 
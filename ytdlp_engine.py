@@ -0,0 +1,177 @@
+"""
+In-process yt-dlp engine.
+
+Running the `yt-dlp` CLI once per video pays interpreter start-up, extractor
+loading and a fresh HTTP stack every time. `YtDlpEngine` keeps `YoutubeDL`
+objects alive instead: one per worker thread and per referer/cookies combo
+(YoutubeDL is not thread-safe), reused for every URL that thread handles.
+Only the output template changes between downloads.
+
+    YTDLP = YtDlpEngine(workers=2, cookies="cookies.txt")
+
+    result = YTDLP.download(url, "out/name_1.mp4", referer="https://www.adsoftheworld.com/")
+    future = YTDLP.submit(url, "out/name_2.mp4", referer=...)   # runs on the pool
+    result = future.result()   # {"url", "path", "ok", "error", "id", "extractor", "seconds"}
+
+If the yt_dlp package is not importable the engine falls back to the CLI,
+so scripts keep working wherever `yt-dlp` is on PATH.
+"""
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+try:
+    from yt_dlp import YoutubeDL
+    from yt_dlp.utils import DownloadError
+except ImportError:  # CLI fallback
+    YoutubeDL = None
+    DownloadError = Exception
+
+YTDLP_WORKERS = 2
+DEFAULT_FORMAT = "bestvideo+bestaudio/best"
+MERGE_FORMAT = "mp4"
+
+
+class _QuietLogger:
+    """Keeps yt-dlp's output from interleaving across worker threads; errors are reported per result."""
+
+    def debug(self, msg):
+        pass
+
+    def info(self, msg):
+        pass
+
+    def warning(self, msg):
+        pass
+
+    def error(self, msg):
+        pass
+
+
+class YtDlpEngine:
+    def __init__(self, workers: int = YTDLP_WORKERS, cookies: Optional[str] = None,
+                 fmt: str = DEFAULT_FORMAT, extra_opts: Optional[dict] = None):
+        self.workers = workers
+        self.cookies = cookies if cookies and Path(cookies).exists() else None
+        self.fmt = fmt
+        self.extra_opts = extra_opts or {}
+        self._local = threading.local()
+        self._open_ydls = []  # every YoutubeDL handed out, closed together in close()
+        self._ydls_lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.ok = 0
+        self.failed = 0
+        self.seconds = 0.0
+
+    # ---------- YoutubeDL instances ----------
+    def _options(self, referer: Optional[str]) -> dict:
+        opts = {
+            "format": self.fmt,
+            "merge_output_format": MERGE_FORMAT,
+            "noplaylist": True,
+            "quiet": True,
+            "noprogress": True,
+            "logger": _QuietLogger(),
+            "outtmpl": {"default": "%(id)s.%(ext)s"},
+        }
+        if referer:
+            opts["http_headers"] = {"Referer": referer}
+        if self.cookies:
+            opts["cookiefile"] = self.cookies
+        opts.update(self.extra_opts)
+        return opts
+
+    def _ydl(self, referer: Optional[str]) -> "YoutubeDL":
+        cache: Dict[Tuple[Optional[str], Optional[str]], YoutubeDL] = getattr(self._local, "ydls", None)
+        if cache is None:
+            cache = self._local.ydls = {}
+        key = (referer, self.cookies)
+        ydl = cache.get(key)
+        with self._ydls_lock:
+            if ydl is None or ydl not in self._open_ydls:  # none yet, or closed by close()
+                ydl = cache[key] = YoutubeDL(self._options(referer))
+                self._open_ydls.append(ydl)
+        return ydl
+
+    # ---------- downloading ----------
+    def _download_in_process(self, url: str, output_path: str, referer: Optional[str], result: dict) -> None:
+        ydl = self._ydl(referer)
+        # Literal path: escape % so yt-dlp does not treat it as a template field
+        ydl.params["outtmpl"]["default"] = output_path.replace("%", "%%")
+        info = ydl.extract_info(url, download=True)
+        if info:
+            result["id"] = info.get("id")
+            result["extractor"] = info.get("extractor_key") or info.get("extractor")
+        result["ok"] = True
+
+    def _download_cli(self, url: str, output_path: str, referer: Optional[str], result: dict) -> None:
+        cmd = ["yt-dlp", "-f", self.fmt, "--merge-output-format", MERGE_FORMAT, "-o", output_path]
+        if referer:
+            cmd[1:1] = ["--referer", referer]
+        if self.cookies:
+            cmd.extend(["--cookies", self.cookies])
+        cmd.extend(["--", url])
+        subprocess.run(cmd, check=True)
+        result["ok"] = True
+
+    def download(self, url: str, output_path, referer: Optional[str] = None) -> dict:
+        """Download one URL in the calling thread and return a result dict (never raises)."""
+        output_path = str(output_path)  # no \\?\ prefix: yt-dlp builds its own temp names
+        result = {"url": url, "path": output_path, "ok": False, "error": None,
+                  "id": None, "extractor": None, "seconds": 0.0}
+        started = time.monotonic()
+        try:
+            os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+            if YoutubeDL is not None:
+                self._download_in_process(url, output_path, referer, result)
+            else:
+                self._download_cli(url, output_path, referer, result)
+        except (DownloadError, subprocess.CalledProcessError, OSError, ValueError) as e:
+            result["error"] = str(e)
+        except Exception as e:  # extractor bugs surface as arbitrary exceptions
+            result["error"] = f"{type(e).__name__}: {e}"
+        result["seconds"] = time.monotonic() - started
+
+        with self._stats_lock:
+            self.seconds += result["seconds"]
+            if result["ok"]:
+                self.ok += 1
+            else:
+                self.failed += 1
+        if result["ok"]:
+            print(f"🎬 Downloaded video: {output_path} ({result['seconds']:.1f}s)")
+        else:
+            print(f"⚠️ yt-dlp failed for {url}: {result['error']}")
+        return result
+
+    def submit(self, url: str, output_path, referer: Optional[str] = None) -> Future:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="yt-dlp")
+        return self._pool.submit(self.download, url, output_path, referer)
+
+    def close(self) -> None:
+        """Wait for submitted downloads, then close every YoutubeDL (saves cookies, releases handles)."""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+        with self._ydls_lock:
+            ydls, self._open_ydls = self._open_ydls, []
+        for ydl in ydls:
+            try:
+                ydl.close()
+            except Exception as e:
+                print(f"⚠️ Could not close yt-dlp instance: {e}")
+
+    def report(self) -> None:
+        done = self.ok + self.failed
+        avg = self.seconds / done if done else 0.0
+        engine = "in-process" if YoutubeDL is not None else "CLI"
+        print(f"🎬 yt-dlp ({engine}): {self.ok} ok, {self.failed} failed, {avg:.1f}s per video")